@@ -1,56 +1,84 @@
+import argparse
+import os
+import sys
+
 import cv2
-import numpy as np
+
+# The shared helpers live in common/ at the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.timing import Profiler
+from pipeline import BLOCK, DROP_OLDEST, Pipeline
+from tracker import CountingLine, Tracker, parse_line
+from vehicle_detection import BLOB_EXTRACTORS, VehicleDetector, compose_display, parse_polygon
+
+parser = argparse.ArgumentParser(description="Vehicle detection using contours")
+parser.add_argument("--source", default="carsvid.mp4", help="video file to read")
+parser.add_argument("--queue-size", type=int, default=4, help="frames buffered between two stages")
+parser.add_argument("--policy", choices=[BLOCK, DROP_OLDEST], default=BLOCK,
+                    help="what to do when a stage falls behind: wait for it or drop the oldest frame")
+parser.add_argument("--blobs", choices=list(BLOB_EXTRACTORS), default="contours",
+                    help="blob extraction method, 'connected' is faster on very noisy masks")
+parser.add_argument("--roi", type=parse_polygon, default=None,
+                    help='road polygon in frame pixels, e.g. "0,400 1920,400 1920,1080 0,1080"')
+parser.add_argument("--scale", type=float, default=1.0, help="processing resolution relative to the video")
+parser.add_argument("--line", type=parse_line, action="append", default=[],
+                    help='counting line in frame pixels, e.g. "0,700 1920,700" (can be repeated)')
+parser.add_argument("--metrics", help="write stage latencies to this file (.json, or .prom for Prometheus)")
+args = parser.parse_args()
 
 kernel = None
 # Loading the video
-cap = cv2.VideoCapture('carsvid.mp4')
+cap = cv2.VideoCapture(args.source)
 
-# Initialize the background object
-background_object = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
+# Initialize the detector, which owns the background object
+detector = VehicleDetector(args.roi, args.scale, blobs=args.blobs, kernel=kernel)
 
-while True:
-    # Reading frame by frame
-    ret, frame = cap.read()
-    if not ret:
-        break
+# Vehicle ids over time and the lines to count them on
+tracker = Tracker()
+lines = [CountingLine(p1, p2, f"line {i + 1}") for i, (p1, p2) in enumerate(args.line)]
 
-    # Apply the background object on frame to get the mask
-    fgmask = background_object.apply(frame)
+# Latency of every stage, printed when the video ends
+profiler = Profiler("vehicle_detection")
 
-    # Performing threshold for removing shadows
-    _, fgmask = cv2.threshold(fgmask, 250, 255, cv2.THRESH_BINARY)
 
-    # Applying morphological operations
-    fgmask = cv2.erode(fgmask, kernel, iterations=1)
-    fgmask = cv2.dilate(fgmask, kernel, iterations=2)
-
-    # Detecting contours
-    contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    copied_frame = frame.copy()
+def read_frame():
+    # Reading frame by frame
+    ret, frame = cap.read()
+    return frame if ret else None
 
-    for cnt in contours:
-        if cv2.contourArea(cnt) > 400:
-            x, y, w, h = cv2.boundingRect(cnt)
-            cv2.rectangle(copied_frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
-            cv2.putText(copied_frame, "Car detected", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.3, (0, 255, 0), 1,
-                        cv2.LINE_AA)
-            
-         
 
-    forgroundPart = cv2.bitwise_and(frame, frame, mask=fgmask)
-    stack = np.hstack((frame, forgroundPart, copied_frame))
+def process(frame):
+    # Get the cleaned up foreground mask and the vehicles in it
+    with profiler.stage("detect"):
+        fgmask, detections = detector.detect(frame)
 
-   
+    # Follow the vehicles and count the ones crossing a line
+    with profiler.stage("track"):
+        tracks = tracker.update(detections)
+        for line in lines:
+            line.update(tracker)
+    return frame, fgmask, detections, tracks
 
 
-    cv2.imshow("Application", cv2.resize(stack, None, fx=0.5, fy=0.5))
+def show(result):
+    frame, fgmask, detections, tracks = result
+    cv2.imshow("Application", compose_display(frame, detector, fgmask, detections, tracks=tracks, lines=lines))
 
     k = cv2.waitKey(1) & 0xff
 
     # Check if 'q' key is pressed.
-    if k == ord('q'):
-        # Break the loop.
-        break
+    return k != ord('q')
+
+
+# Decoding, processing and display each run on their own thread
+pipeline = Pipeline(read_frame, process, show, queue_size=args.queue_size, policy=args.policy, profiler=profiler)
+pipeline.run()
+pipeline.print_report()
+if args.metrics:
+    profiler.dump(args.metrics)
+for line in lines:
+    print(f"{line.name}: {line.forward} forward, {line.backward} backward, {line.total} vehicles")
 
 cap.release()
 cv2.destroyAllWindows()
@@ -0,0 +1,169 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from vehicle_detection import BLOB_EXTRACTORS, MIN_CONTOUR_AREA, VehicleDetector, parse_polygon
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".mpg", ".mpeg", ".wmv")
+FORMATS = ("jsonl", "csv")
+
+
+def collect_videos(inputs):
+    """Expand directories and glob patterns into a sorted list of video files"""
+    videos = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in files:
+                    if name.lower().endswith(VIDEO_EXTENSIONS):
+                        videos.add(os.path.join(root, name))
+        else:
+            for path in glob.glob(item, recursive=True):
+                if os.path.isfile(path):
+                    videos.add(path)
+    return sorted(videos)
+
+
+class JsonlWriter:
+    """One line per frame: {"frame": 12, "detections": [{"x": .., "area": ..}]}"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, frame_index, detections):
+        record = {
+            "frame": frame_index,
+            "detections": [{"x": x, "y": y, "w": w, "h": h, "area": area} for x, y, w, h, area in detections.tolist()],
+        }
+        self.f.write(json.dumps(record) + "\n")
+
+
+class CsvWriter:
+    """One row per detection: frame,x,y,w,h,area"""
+
+    def __init__(self, f):
+        self.writer = csv.writer(f)
+        self.writer.writerow(["frame", "x", "y", "w", "h", "area"])
+
+    def write(self, frame_index, detections):
+        for row in detections.tolist():
+            self.writer.writerow([frame_index] + row)
+
+
+WRITERS = {"jsonl": JsonlWriter, "csv": CsvWriter}
+
+
+def output_path(video_path, output_dir, fmt):
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(output_dir, f"{name}.{fmt}")
+
+
+def detect_video(video_path, out_path, fmt="jsonl", min_area=MIN_CONTOUR_AREA, blobs="contours", roi=None,
+                 scale=1.0):
+    """Run the detector over one video and stream its detections to out_path"""
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {video_path}")
+
+    detector = VehicleDetector(roi, scale, min_area, blobs)
+    frames = 0
+    total_detections = 0
+    try:
+        with open(out_path, "w", newline="") as f:
+            writer = WRITERS[fmt](f)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                _, detections = detector.detect(frame)
+                writer.write(frames, detections)
+                frames += 1
+                total_detections += len(detections)
+    finally:
+        cap.release()
+
+    return {
+        "video": video_path,
+        "output": out_path,
+        "frames": frames,
+        "detections": total_detections,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _init_worker():
+    # Each process works on its own video, so OpenCV's own threads would only
+    # compete with the other workers for the same cores
+    cv2.setNumThreads(1)
+
+
+def detect_videos(videos, output_dir, fmt="jsonl", workers=None, min_area=MIN_CONTOUR_AREA, blobs="contours",
+                  roi=None, scale=1.0):
+    """Spread the videos over a process pool and yield one summary per video"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format: {fmt}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Two inputs with the same file name would overwrite each other's output
+    paths = {}
+    for video in videos:
+        path = output_path(video, output_dir, fmt)
+        if path in paths:
+            raise ValueError(f"{video} and {paths[path]} would both be written to {path}")
+        paths[path] = video
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(detect_video, video, path, fmt, min_area, blobs, roi, scale): video
+                   for path, video in paths.items()}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"video": futures[future], "error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless vehicle detection over many videos")
+    parser.add_argument("inputs", nargs="+", help="video files, directories or glob patterns")
+    parser.add_argument("--output-dir", default="detections", help="where to write one file per video")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl", help="output file format")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all cores)")
+    parser.add_argument("--min-area", type=float, default=MIN_CONTOUR_AREA, help="smallest blob area to keep")
+    parser.add_argument("--blobs", choices=list(BLOB_EXTRACTORS), default="contours",
+                        help="blob extraction method, 'connected' is faster on very noisy masks")
+    parser.add_argument("--roi", type=parse_polygon, default=None,
+                        help='road polygon in frame pixels, e.g. "0,400 1920,400 1920,1080 0,1080"')
+    parser.add_argument("--scale", type=float, default=1.0, help="processing resolution relative to the video")
+    args = parser.parse_args()
+
+    videos = collect_videos(args.inputs)
+    if not videos:
+        parser.error("no video files found")
+
+    start = time.perf_counter()
+    frames = 0
+    failed = 0
+    for summary in detect_videos(videos, args.output_dir, args.format, args.workers, args.min_area,
+                                 args.blobs, args.roi, args.scale):
+        if "error" in summary:
+            failed += 1
+            print(f"FAILED {summary['video']}: {summary['error']}")
+            continue
+        frames += summary["frames"]
+        print(f"{summary['video']}: {summary['frames']} frames, {summary['detections']} detections "
+              f"in {summary['seconds']:.1f}s -> {summary['output']}")
+
+    elapsed = time.perf_counter() - start
+    print(f"\n{len(videos) - failed}/{len(videos)} videos, {frames} frames in {elapsed:.1f}s "
+          f"({frames / elapsed:.1f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from vehicle_detection import find_vehicles, find_vehicles_connected, find_vehicles_contours
+
+
+def make_mask(width, height, vehicles, noise, seed=0):
+    """Foreground mask with some vehicle sized blobs and lots of small specks"""
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    for _ in range(vehicles):
+        x, y = rng.integers(0, width - 80), rng.integers(0, height - 60)
+        cv2.rectangle(mask, (int(x), int(y)), (int(x) + 60, int(y) + 40), 255, -1)
+    for _ in range(noise):
+        x, y = rng.integers(0, width), rng.integers(0, height)
+        cv2.circle(mask, (int(x), int(y)), int(rng.integers(1, 4)), 255, -1)
+    return mask
+
+
+def frames_per_second(find, mask, seconds):
+    """Call find(mask) over and over for about `seconds` and return calls per second"""
+    find(mask)
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        find(mask)
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blob extraction microbenchmark")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent on every measurement")
+    args = parser.parse_args()
+
+    scenes = {
+        "sparse": make_mask(args.width, args.height, vehicles=5, noise=50),
+        "crowded": make_mask(args.width, args.height, vehicles=60, noise=5000),
+    }
+    methods = {
+        "loop": find_vehicles_contours,
+        "vectorized": find_vehicles,
+        "connected": find_vehicles_connected,
+    }
+
+    print(f"{'scene':<10}{'blobs':>8}{'method':>12}{'frames/s':>12}")
+    for scene, mask in scenes.items():
+        blobs = cv2.connectedComponents(mask)[0] - 1
+        for method, find in methods.items():
+            fps = frames_per_second(find, mask, args.seconds)
+            print(f"{scene:<10}{blobs:>8}{method:>12}{fps:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
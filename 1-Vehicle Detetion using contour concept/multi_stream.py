@@ -0,0 +1,295 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+
+import cv2
+
+from vehicle_detection import BLOB_EXTRACTORS, VehicleDetector
+
+
+def open_capture(source):
+    """Open a device index ("0"), a stream URL or a video file"""
+    return cv2.VideoCapture(int(source) if source.isdigit() else source)
+
+
+def is_live(source):
+    return source.isdigit() or "://" in source
+
+
+class StreamReader:
+    """Reads one source on its own thread and keeps only the newest frame.
+
+    Live sources (devices, RTSP/HTTP URLs) are read as fast as they deliver,
+    and files are paced at their own frame rate so they stand in for a live
+    camera. Every frame replaced before a worker got to it counts as skipped,
+    which is how an overloaded stream sheds load. With realtime=False a file is
+    read only as fast as it is consumed and nothing is skipped. A read that
+    raises ends the stream and is kept in `error`.
+    """
+
+    def __init__(self, source, realtime=True, loop=False):
+        self.source = source
+        self.live = is_live(source)
+        self.realtime = realtime or self.live
+        self.loop = loop and not self.live
+        self.capture = open_capture(source)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open source: {source}")
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.frame_interval = 1 / fps if fps and fps > 0 else 1 / 25
+
+        self.condition = threading.Condition()
+        self.frame = None
+        self.frame_index = -1
+        self.frames_read = 0
+        self.skipped = 0
+        self.finished = False
+        self.error = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._read_loop, name=f"reader {source}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _read(self):
+        ret, frame = self.capture.read()
+        if not ret and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        return frame if ret else None
+
+    def _read_loop(self):
+        next_time = time.perf_counter()
+        while not self.stop_event.is_set():
+            if self.realtime and not self.live:
+                # Pace files like a camera would deliver them
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_time = max(next_time + self.frame_interval, time.perf_counter() - self.frame_interval)
+
+            try:
+                frame = self._read()
+            except Exception as error:
+                self.error = error
+                frame = None
+            with self.condition:
+                if frame is None:
+                    self.finished = True
+                    self.condition.notify_all()
+                    break
+                if not self.realtime:
+                    # Wait for the previous frame to be taken instead of skipping it
+                    while self.frame is not None and not self.stop_event.is_set():
+                        self.condition.wait(0.1)
+                elif self.frame is not None:
+                    self.skipped += 1
+                self.frame = frame
+                self.frame_index += 1
+                self.frames_read += 1
+                self.condition.notify_all()
+
+    def take(self):
+        """Return (frame_index, frame) for the newest unseen frame, or None"""
+        with self.condition:
+            if self.frame is None:
+                return None
+            frame, self.frame = self.frame, None
+            self.condition.notify_all()
+            return self.frame_index, frame
+
+    @property
+    def done(self):
+        with self.condition:
+            return self.finished and self.frame is None
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.capture.release()
+
+
+class Stream:
+    """One source with its own background model and statistics.
+
+    `error` is set when reading or processing the stream failed, which
+    ends that stream only.
+    """
+
+    def __init__(self, source, detector, realtime=True, loop=False):
+        self.source = source
+        self.reader = StreamReader(source, realtime, loop)
+        self.detector = detector
+        self.processed = 0
+        self.busy_time = 0.0
+        self.started = None
+        self.last_detections = 0
+        self.error = None
+
+    @property
+    def ended(self):
+        return self.error is not None or self.reader.done
+
+    def stats(self, now):
+        elapsed = now - self.started if self.started else 0
+        return {
+            "source": self.source,
+            "read": self.reader.frames_read,
+            "processed": self.processed,
+            "skipped": self.reader.skipped,
+            "fps": round(self.processed / elapsed, 2) if elapsed else 0.0,
+            "avg_ms": round(1000 * self.busy_time / self.processed, 2) if self.processed else 0.0,
+            "detections": self.last_detections,
+            "error": str(self.error) if self.error is not None else None,
+        }
+
+
+class MultiStreamRunner:
+    """Runs vehicle detection on many streams with a fixed pool of worker threads.
+
+    Streams wait their turn in a FIFO queue, so every worker picks the stream
+    that was served longest ago (fair round robin), processes its newest
+    frame and puts it back at the end of the queue. A stream is only ever
+    handled by one worker at a time, so its MOG2 state is never shared.
+    OpenCV releases the GIL while it works, so the workers run in parallel.
+    A stream whose detector or reader raises is marked failed and leaves
+    the queue, the others keep running.
+
+    on_result(stream, frame_index, detections) is called from the workers
+    for every processed frame.
+    """
+
+    def __init__(self, streams, workers=4, on_result=None):
+        self.streams = streams
+        self.workers = workers
+        self.on_result = on_result
+        self.ready = queue.Queue()
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.started = None
+
+    def _work(self):
+        while not self.stop_event.is_set():
+            try:
+                stream = self.ready.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            item = stream.reader.take()
+            if item is None:
+                if stream.reader.done:
+                    # The stream has ended, it does not go back in the queue
+                    stream.error = stream.reader.error
+                    continue
+                # Nothing new yet, let the next stream have its turn
+                self.ready.put(stream)
+                time.sleep(0.001)
+                continue
+
+            frame_index, frame = item
+            try:
+                start = time.perf_counter()
+                _, detections = stream.detector.detect(frame)
+                stream.busy_time += time.perf_counter() - start
+                stream.processed += 1
+                stream.last_detections = len(detections)
+                if self.on_result is not None:
+                    self.on_result(stream, frame_index, detections)
+            except Exception as error:
+                stream.error = error
+                continue
+            self.ready.put(stream)
+
+    def stats(self):
+        """Aggregate and per-stream throughput"""
+        now = time.perf_counter()
+        per_stream = [stream.stats(now) for stream in self.streams]
+        elapsed = now - self.started if self.started else 0
+        processed = sum(s["processed"] for s in per_stream)
+        return {
+            "streams": per_stream,
+            "processed": processed,
+            "skipped": sum(s["skipped"] for s in per_stream),
+            "failed": sum(s["error"] is not None for s in per_stream),
+            "fps": round(processed / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def running(self):
+        return not self.stop_event.is_set() and not all(stream.ended for stream in self.streams)
+
+    def start(self):
+        self.started = time.perf_counter()
+        for stream in self.streams:
+            stream.started = self.started
+            stream.reader.start()
+            self.ready.put(stream)
+        self.threads = [threading.Thread(target=self._work, name=f"worker {i}", daemon=True)
+                        for i in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+        for stream in self.streams:
+            stream.reader.stop()
+
+
+def print_stats(stats):
+    print(f"{'source':<40}{'read':>8}{'done':>8}{'skipped':>9}{'fps':>8}{'ms':>8}")
+    for s in stats["streams"]:
+        print(f"{s['source'][-40:]:<40}{s['read']:>8}{s['processed']:>8}{s['skipped']:>9}"
+              f"{s['fps']:>8.1f}{s['avg_ms']:>8.1f}")
+    for s in stats["streams"]:
+        if s["error"] is not None:
+            print(f"{s['source']}: failed: {s['error']}")
+    print(f"{'total':<40}{'':>8}{stats['processed']:>8}{stats['skipped']:>9}{stats['fps']:>8.1f}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vehicle detection on many streams at once")
+    parser.add_argument("sources", nargs="+", help="video files, stream URLs or device indices")
+    parser.add_argument("--workers", type=int, default=4, help="number of processing threads")
+    parser.add_argument("--no-realtime", action="store_true",
+                        help="read files as fast as they are processed instead of at their frame rate")
+    parser.add_argument("--loop", action="store_true", help="restart video files when they end")
+    parser.add_argument("--scale", type=float, default=1.0, help="processing resolution relative to the video")
+    parser.add_argument("--blobs", choices=list(BLOB_EXTRACTORS), default="contours", help="blob extraction method")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="seconds between statistics")
+    parser.add_argument("--json", action="store_true", help="print statistics as JSON lines")
+    args = parser.parse_args()
+
+    # Every worker runs OpenCV on its own, nested threads would only compete with them
+    cv2.setNumThreads(1)
+
+    streams = [Stream(source, VehicleDetector(scale=args.scale, blobs=args.blobs), not args.no_realtime, args.loop)
+               for source in args.sources]
+    report = (lambda stats: print(json.dumps(stats))) if args.json else print_stats
+
+    runner = MultiStreamRunner(streams, args.workers).start()
+    last_report = time.perf_counter()
+    try:
+        while runner.running():
+            time.sleep(0.1)
+            if time.perf_counter() - last_report >= args.report_interval:
+                last_report = time.perf_counter()
+                report(runner.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+
+    stats = runner.stats()
+    report(stats)
+    if stats["failed"]:
+        sys.exit(f"{stats['failed']} of {len(streams)} streams failed")
+
+
+if __name__ == "__main__":
+    main()
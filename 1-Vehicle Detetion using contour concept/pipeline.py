@@ -0,0 +1,149 @@
+import queue
+import threading
+import time
+
+from common.timing import Profiler
+
+# Backpressure policies for the queues between stages
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+# Marker pushed through the queues when the source runs out of frames
+_END = object()
+
+
+class FrameQueue:
+    """Bounded queue between two stages with drop-oldest or block backpressure"""
+
+    def __init__(self, maxsize=4, policy=BLOCK):
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.policy = policy
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, item, stop_event):
+        """Put an item, either waiting for space or dropping the oldest item"""
+        while not stop_event.is_set():
+            try:
+                if self.policy == BLOCK or item is _END:
+                    self.queue.put(item, timeout=0.1)
+                else:
+                    self.queue.put_nowait(item)
+                return True
+            except queue.Full:
+                if self.policy == DROP_OLDEST:
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+        return False
+
+    def get(self, stop_event):
+        """Get the next item, returning _END once the pipeline is stopped"""
+        while not stop_event.is_set():
+            try:
+                return self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+
+class Pipeline:
+    """Decode -> process -> sink pipeline where every stage runs concurrently.
+
+    The decoder and processing stages run on their own threads, the sink runs
+    on the calling thread so it can own the OpenCV GUI. The stages are joined
+    by bounded queues, so the whole pipeline runs at the speed of its slowest
+    stage instead of the sum of all of them.
+
+    read_frame() returns a frame or None when the source is exhausted,
+    process(frame) returns anything, and sink(result) returns False to stop.
+    If read_frame() or process() raises, the pipeline stops and run()
+    raises that exception. The latency of every stage is recorded in
+    `profiler`.
+    """
+
+    def __init__(self, read_frame, process, sink, queue_size=4, policy=BLOCK, profiler=None):
+        self.read_frame = read_frame
+        self.process = process
+        self.sink = sink
+        self.decoded = FrameQueue(queue_size, policy)
+        self.processed = FrameQueue(queue_size, policy)
+        self.profiler = profiler or Profiler("pipeline")
+        self.stop_event = threading.Event()
+        self.error = None
+
+    def _guard(self, loop):
+        # Keep the first exception of a worker for run(); once stop_event is
+        # set every get() returns _END, so the other stages and run() finish
+        try:
+            loop()
+        except BaseException as error:
+            if self.error is None:
+                self.error = error
+            self.stop_event.set()
+
+    def _decode_loop(self):
+        stats = self.profiler.get("decode")
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            frame = self.read_frame()
+            if frame is None:
+                break
+            stats.record(time.perf_counter() - start)
+            if not self.decoded.put(frame, self.stop_event):
+                return
+        self.decoded.put(_END, self.stop_event)
+
+    def _process_loop(self):
+        stats = self.profiler.get("process")
+        while True:
+            frame = self.decoded.get(self.stop_event)
+            if frame is _END:
+                break
+            start = time.perf_counter()
+            result = self.process(frame)
+            stats.record(time.perf_counter() - start)
+            if not self.processed.put(result, self.stop_event):
+                return
+        self.processed.put(_END, self.stop_event)
+
+    def run(self):
+        """Run until the source is exhausted or the sink asks to stop"""
+        workers = [
+            threading.Thread(target=self._guard, args=(self._decode_loop,), name="decode", daemon=True),
+            threading.Thread(target=self._guard, args=(self._process_loop,), name="process", daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        stats = self.profiler.get("sink")
+        try:
+            while True:
+                result = self.processed.get(self.stop_event)
+                if result is _END:
+                    break
+                start = time.perf_counter()
+                keep_going = self.sink(result)
+                stats.record(time.perf_counter() - start)
+                self.profiler.tick()
+                if keep_going is False:
+                    break
+        finally:
+            self.stop_event.set()
+            for worker in workers:
+                worker.join()
+        if self.error is not None:
+            raise self.error
+
+    def report(self):
+        """Per-stage latency and throughput, plus the frames dropped by each queue"""
+        report = self.profiler.summary()
+        report["dropped"] = {"decoded": self.decoded.dropped, "processed": self.processed.dropped}
+        return report
+
+    def print_report(self):
+        self.profiler.print_summary()
+        print(f"dropped: decoded {self.decoded.dropped}, processed {self.processed.dropped}")
@@ -0,0 +1,259 @@
+import cv2
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """IoU between every x, y, w, h box in a (N, 4) and every box in b (M, 4)"""
+    ax0, ay0 = a[:, 0:1], a[:, 1:2]
+    ax1, ay1 = ax0 + a[:, 2:3], ay0 + a[:, 3:4]
+    bx0, by0 = b[:, 0], b[:, 1]
+    bx1, by1 = bx0 + b[:, 2], by0 + b[:, 3]
+
+    inter_w = np.clip(np.minimum(ax1, bx1) - np.maximum(ax0, bx0), 0, None)
+    inter_h = np.clip(np.minimum(ay1, by1) - np.maximum(ay0, by0), 0, None)
+    inter = inter_w * inter_h
+    union = a[:, 2:3] * a[:, 3:4] + b[:, 2] * b[:, 3] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+def cross(a, b):
+    """z component of the cross product of 2D vectors, over the last axis"""
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+def match(cost, valid):
+    """Greedy one-to-one matching of rows to columns on a cost matrix.
+
+    Every round pairs each row with the column it likes best when that column
+    also likes the row best, so the work is done on whole arrays and the
+    number of rounds stays small. Returns matched (rows, cols).
+    """
+    cost = np.where(valid, cost, np.inf)
+    rows_left = np.arange(cost.shape[0])
+    cols_left = np.arange(cost.shape[1])
+    matched_rows, matched_cols = [], []
+
+    while len(rows_left) and len(cols_left):
+        sub = cost[np.ix_(rows_left, cols_left)]
+        best_col = sub.argmin(axis=1)
+        best_row = sub.argmin(axis=0)
+        row_idx = np.arange(len(rows_left))
+        mutual = (best_row[best_col] == row_idx) & np.isfinite(sub[row_idx, best_col])
+        if not mutual.any():
+            break
+        matched_rows.append(rows_left[mutual])
+        matched_cols.append(cols_left[best_col[mutual]])
+        rows_left = rows_left[~mutual]
+        cols_left = np.delete(cols_left, best_col[mutual])
+
+    if not matched_rows:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate(matched_rows), np.concatenate(matched_cols)
+
+
+class Tracker:
+    """Gives detections a persistent vehicle id from frame to frame.
+
+    All track state is kept in NumPy arrays and every frame is associated
+    through one cost matrix: 1 - IoU for overlapping boxes, and the distance
+    between centroids (in box diagonals) for fast vehicles whose boxes no
+    longer overlap. Tracks are predicted forward with a constant velocity,
+    reported once they were seen `min_hits` times and dropped after
+    `max_missed` frames without a detection.
+    """
+
+    def __init__(self, iou_threshold=0.2, max_distance=1.0, min_hits=3, max_missed=10):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.min_hits = min_hits
+        self.max_missed = max_missed
+        self.next_id = 1
+
+        self.ids = np.empty(0, dtype=np.int64)
+        self.boxes = np.empty((0, 4))
+        self.velocity = np.empty((0, 2))
+        self.hits = np.empty(0, dtype=np.int64)
+        self.missed = np.empty(0, dtype=np.int64)
+        self.last_centroids = np.empty((0, 2))
+
+        # Tracks matched in the last update, with their centroid before and after
+        # and whether they are confirmed
+        self.moved_ids = np.empty(0, dtype=np.int64)
+        self.moved_from = np.empty((0, 2))
+        self.moved_to = np.empty((0, 2))
+        self.moved_confirmed = np.empty(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def cost_matrix(self, predicted, boxes):
+        """Association cost between every predicted track and every detection"""
+        iou = iou_matrix(predicted, boxes)
+        track_centroids = predicted[:, :2] + predicted[:, 2:] / 2
+        centroids = boxes[:, :2] + boxes[:, 2:] / 2
+        diagonal = np.hypot(predicted[:, 2], predicted[:, 3])[:, None]
+        dx = track_centroids[:, 0:1] - centroids[:, 0]
+        dy = track_centroids[:, 1:2] - centroids[:, 1]
+        distance = np.sqrt(dx * dx + dy * dy) / np.maximum(diagonal, 1)
+
+        overlapping = iou >= self.iou_threshold
+        cost = np.where(overlapping, 1 - iou, 1 + distance)
+        valid = overlapping | (distance <= self.max_distance)
+        return cost, valid
+
+    def update(self, detections):
+        """Update the tracks with one frame of (N, 5) x, y, w, h, area detections.
+
+        Returns an (K, 5) int array of id, x, y, w, h for the confirmed tracks
+        that were detected in this frame.
+        """
+        boxes = np.asarray(detections, dtype=np.float64).reshape(-1, 5)[:, :4]
+        predicted = self.boxes.copy()
+        predicted[:, :2] += self.velocity
+
+        rows, cols = match(*self.cost_matrix(predicted, boxes))
+
+        # Matched tracks take the detected box and update their velocity
+        centroids = boxes[cols, :2] + boxes[cols, 2:] / 2
+        old_centroids = self.boxes[rows, :2] + self.boxes[rows, 2:] / 2
+        self.velocity[rows] = 0.5 * self.velocity[rows] + 0.5 * (centroids - old_centroids)
+        self.moved_ids = self.ids[rows]
+        self.moved_from = self.last_centroids[rows]
+        self.moved_to = centroids
+        self.last_centroids[rows] = centroids
+
+        # Unmatched tracks coast along their prediction until they are dropped
+        self.boxes = predicted
+        self.boxes[rows] = boxes[cols]
+        self.hits[rows] += 1
+        self.moved_confirmed = self.hits[rows] >= self.min_hits
+        self.missed += 1
+        self.missed[rows] = 0
+
+        keep = self.missed <= self.max_missed
+        self._select(keep)
+
+        # Unmatched detections start new tracks
+        new = np.ones(len(boxes), dtype=bool)
+        new[cols] = False
+        self._add(boxes[new])
+
+        confirmed = (self.hits >= self.min_hits) & (self.missed == 0)
+        return np.column_stack((self.ids[confirmed], np.round(self.boxes[confirmed]))).astype(np.int64)
+
+    def confirmed_ids(self):
+        """Ids of the tracks seen at least `min_hits` times"""
+        return self.ids[self.hits >= self.min_hits]
+
+    def _select(self, keep):
+        self.ids = self.ids[keep]
+        self.boxes = self.boxes[keep]
+        self.velocity = self.velocity[keep]
+        self.hits = self.hits[keep]
+        self.missed = self.missed[keep]
+        self.last_centroids = self.last_centroids[keep]
+
+    def _add(self, boxes):
+        count = len(boxes)
+        self.ids = np.concatenate((self.ids, np.arange(self.next_id, self.next_id + count)))
+        self.next_id += count
+        self.boxes = np.concatenate((self.boxes, boxes))
+        self.velocity = np.concatenate((self.velocity, np.zeros((count, 2))))
+        self.hits = np.concatenate((self.hits, np.ones(count, dtype=np.int64)))
+        self.missed = np.concatenate((self.missed, np.zeros(count, dtype=np.int64)))
+        self.last_centroids = np.concatenate((self.last_centroids, boxes[:, :2] + boxes[:, 2:] / 2))
+
+
+def parse_line(text):
+    """Parse "x,y x,y" into the two end points of a counting line"""
+    points = [tuple(int(v) for v in point.split(",")) for point in text.split()]
+    if len(points) != 2 or any(len(point) != 2 for point in points):
+        raise ValueError(f"A counting line needs two x,y points, got: {text!r}")
+    return points
+
+
+class CountingLine:
+    """Virtual line that counts every track crossing it once.
+
+    Crossings are counted per direction: `forward` for tracks moving to the
+    left side of the line on screen when looking from p1 to p2, `backward`
+    for the other way. Only confirmed tracks are counted, the ones that are
+    also drawn: a track that crosses before it is confirmed is counted once
+    it is, and forgotten if the tracker drops it first.
+    """
+
+    def __init__(self, p1, p2, name=""):
+        self.p1 = np.asarray(p1, dtype=np.float64)
+        self.p2 = np.asarray(p2, dtype=np.float64)
+        self.name = name
+        self.forward = 0
+        self.backward = 0
+        self.counted = np.empty(0, dtype=np.int64)
+        # Tentative tracks that crossed, with the direction they crossed in
+        self.pending_ids = np.empty(0, dtype=np.int64)
+        self.pending_forward = np.empty(0, dtype=bool)
+
+    def _count(self, ids, forward):
+        self.forward += int(np.count_nonzero(forward))
+        self.backward += int(np.count_nonzero(~forward))
+        self.counted = np.concatenate((self.counted, ids))
+
+    def update(self, tracker):
+        """Count the tracks that crossed the line in the tracker's last update"""
+        if len(self.pending_ids):
+            confirmed = np.isin(self.pending_ids, tracker.confirmed_ids())
+            self._count(self.pending_ids[confirmed], self.pending_forward[confirmed])
+            alive = ~confirmed & np.isin(self.pending_ids, tracker.ids)
+            self.pending_ids = self.pending_ids[alive]
+            self.pending_forward = self.pending_forward[alive]
+
+        ids, start, end = tracker.moved_ids, tracker.moved_from, tracker.moved_to
+        if not len(ids):
+            return
+
+        direction = self.p2 - self.p1
+        motion = end - start
+        side_before = cross(direction, start - self.p1) >= 0
+        side_after = cross(direction, end - self.p1) >= 0
+
+        # Where the motion crosses the line, as a fraction of the line's length
+        denominator = cross(direction, motion)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            along = cross(start - self.p1, motion) / denominator
+
+        crossed = (side_before != side_after) & (along >= 0) & (along <= 1)
+        crossed &= ~np.isin(ids, self.counted) & ~np.isin(ids, self.pending_ids)
+        if not crossed.any():
+            return
+
+        # The y axis points down, so a negative cross product is the left side on screen
+        forward = ~side_after
+        confirmed = crossed & tracker.moved_confirmed
+        self._count(ids[confirmed], forward[confirmed])
+        tentative = crossed & ~tracker.moved_confirmed
+        self.pending_ids = np.concatenate((self.pending_ids, ids[tentative]))
+        self.pending_forward = np.concatenate((self.pending_forward, forward[tentative]))
+
+    @property
+    def total(self):
+        return self.forward + self.backward
+
+
+def draw_tracks(frame, tracks, scale=1.0):
+    """Draw a box and the vehicle id for every (id, x, y, w, h) track"""
+    for track_id, x, y, w, h in np.round(tracks * (1, scale, scale, scale, scale)).astype(np.int64).tolist():
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+        cv2.putText(frame, f"Car {track_id}", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1,
+                    cv2.LINE_AA)
+    return frame
+
+
+def draw_lines(frame, lines, scale=1.0):
+    """Draw every counting line with its counts"""
+    for line in lines:
+        p1 = tuple(int(v) for v in np.round(line.p1 * scale))
+        p2 = tuple(int(v) for v in np.round(line.p2 * scale))
+        cv2.line(frame, p1, p2, (0, 255, 255), 2)
+        cv2.putText(frame, f"{line.name} {line.forward}/{line.backward}", (p1[0] + 5, p1[1] - 8),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1, cv2.LINE_AA)
+    return frame
@@ -0,0 +1,208 @@
+import cv2
+import numpy as np
+
+from tracker import draw_lines, draw_tracks
+
+# Blobs smaller than this (in pixels) are treated as noise
+MIN_CONTOUR_AREA = 400
+
+
+def create_background_subtractor():
+    """Create the MOG2 background subtractor used to separate moving vehicles"""
+    return cv2.createBackgroundSubtractorMOG2(detectShadows=True)
+
+
+def foreground_mask(background_object, frame, kernel=None, roi_mask=None):
+    """Apply the background object on a frame and clean up the resulting mask"""
+    fgmask = background_object.apply(frame)
+
+    # Performing threshold for removing shadows
+    _, fgmask = cv2.threshold(fgmask, 250, 255, cv2.THRESH_BINARY)
+
+    # Keeping only the road area
+    if roi_mask is not None:
+        cv2.bitwise_and(fgmask, roi_mask, dst=fgmask)
+
+    # Applying morphological operations
+    fgmask = cv2.erode(fgmask, kernel, iterations=1)
+    fgmask = cv2.dilate(fgmask, kernel, iterations=2)
+    return fgmask
+
+
+def find_vehicles(fgmask, min_area=MIN_CONTOUR_AREA):
+    """Return an (N, 5) int32 array of x, y, w, h, area for every blob bigger than min_area.
+
+    Gives the same boxes and areas as calling cv2.contourArea and
+    cv2.boundingRect on every contour, but measures all contours at once
+    with NumPy instead of making two OpenCV calls per contour.
+    """
+    contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return np.empty((0, 5), dtype=np.int32)
+
+    # All contour points in one array, with the index where each contour starts
+    lengths = np.fromiter(map(len, contours), dtype=np.intp, count=len(contours))
+    starts = np.zeros(len(contours), dtype=np.intp)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    x, y = points[:, 0], points[:, 1]
+
+    # Shoelace formula, where the last point of every contour wraps to its first
+    following = np.arange(1, len(points) + 1)
+    following[starts + lengths - 1] = starts
+    twice_area = np.abs(np.add.reduceat(x * y[following] - x[following] * y, starts))
+
+    x_min, x_max = np.minimum.reduceat(x, starts), np.maximum.reduceat(x, starts)
+    y_min, y_max = np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)
+    detections = np.stack((x_min, y_min, x_max - x_min + 1, y_max - y_min + 1, twice_area // 2), axis=1)
+    return detections[twice_area > 2 * min_area].astype(np.int32)
+
+
+def find_vehicles_connected(fgmask, min_area=MIN_CONTOUR_AREA):
+    """Same output as find_vehicles, using connected components instead of contours.
+
+    The area here is the number of pixels in the blob, which is a bit larger
+    than the contour area. Labelling touches every pixel, so this is slower
+    than find_vehicles on sparse masks, but faster on noisy masks with thousands
+    of blobs because its cost does not depend on the number of blobs.
+    """
+    _, _, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(fgmask, 8, cv2.CV_32S, cv2.CCL_GRANA)
+
+    # Row 0 is the background, the columns are already x, y, w, h, area
+    stats = stats[1:]
+    return stats[stats[:, cv2.CC_STAT_AREA] > min_area]
+
+
+def find_vehicles_contours(fgmask, min_area=MIN_CONTOUR_AREA):
+    """Per-contour loop version of find_vehicles, kept for comparison"""
+    contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    detections = []
+    for cnt in contours:
+        area = cv2.contourArea(cnt)
+        if area > min_area:
+            x, y, w, h = cv2.boundingRect(cnt)
+            detections.append((x, y, w, h, area))
+    return np.array(detections, dtype=np.int32).reshape(-1, 5)
+
+
+# Blob extraction methods, by the name used on the command line
+BLOB_EXTRACTORS = {"contours": find_vehicles, "connected": find_vehicles_connected}
+
+
+def parse_polygon(text):
+    """Parse "x,y x,y x,y ..." into an (N, 2) int32 array of polygon points"""
+    points = np.array([[int(v) for v in point.split(",")] for point in text.split()], dtype=np.int32)
+    if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+        raise ValueError(f"A polygon needs at least three x,y points, got: {text!r}")
+    return points
+
+
+class VehicleDetector:
+    """Background subtraction and blob extraction on a downscaled road region.
+
+    Only the bounding box of the roi polygon is cropped from every frame and
+    resized by `scale` before it reaches the background subtractor, so the
+    modelling and morphology work on a fraction of the pixels. Detections are
+    mapped back to full resolution frame coordinates.
+    """
+
+    def __init__(self, roi=None, scale=1.0, min_area=MIN_CONTOUR_AREA, blobs="contours", kernel=None):
+        if not 0 < scale <= 1:
+            raise ValueError(f"scale must be in (0, 1], got {scale}")
+        self.roi = None if roi is None else np.asarray(roi, dtype=np.int32).reshape(-1, 2)
+        self.scale = scale
+        self.min_area = min_area
+        self.find_vehicles = BLOB_EXTRACTORS[blobs]
+        self.kernel = kernel
+        self.background_object = create_background_subtractor()
+        self.frame_size = None
+
+    def _setup(self, frame):
+        """Work out the crop, processing size and roi mask from the first frame"""
+        height, width = frame.shape[:2]
+        self.frame_size = (width, height)
+
+        if self.roi is None:
+            x, y, w, h = 0, 0, width, height
+        else:
+            x, y, w, h = cv2.boundingRect(self.roi)
+            x, y = max(x, 0), max(y, 0)
+            w, h = min(w, width - x), min(h, height - y)
+            if w <= 0 or h <= 0:
+                raise ValueError("The roi polygon is outside the frame")
+        self.crop = (x, y, w, h)
+        self.size = (max(1, round(w * self.scale)), max(1, round(h * self.scale)))
+        self.factors = np.array([self.size[0] / w, self.size[1] / h])
+
+        self.roi_mask = None
+        if self.roi is not None:
+            self.roi_mask = np.zeros((self.size[1], self.size[0]), dtype=np.uint8)
+            points = np.round((self.roi - (x, y)) * self.factors).astype(np.int32)
+            cv2.fillPoly(self.roi_mask, [points], 255)
+
+    def mask(self, frame):
+        """Foreground mask of the road region at processing resolution"""
+        if self.frame_size is None:
+            self._setup(frame)
+        x, y, w, h = self.crop
+        region = frame[y:y + h, x:x + w]
+        if self.size != (w, h):
+            region = cv2.resize(region, self.size, interpolation=cv2.INTER_AREA)
+        return foreground_mask(self.background_object, region, self.kernel, self.roi_mask)
+
+    def detect(self, frame):
+        """Return the processing mask and the detections in frame coordinates"""
+        fgmask = self.mask(frame)
+        fx, fy = self.factors
+        detections = self.find_vehicles(fgmask, self.min_area * fx * fy)
+        return fgmask, self.to_frame(detections)
+
+    def to_frame(self, detections):
+        """Map x, y, w, h, area rows from processing to frame coordinates"""
+        fx, fy = self.factors
+        x, y = self.crop[:2]
+        scaled = detections / (fx, fy, fx, fy, fx * fy) + (x, y, 0, 0, 0)
+        return np.round(scaled).astype(np.int32)
+
+    def display_mask(self, fgmask, width, height):
+        """Paste the processing mask into a blank mask of the given display size"""
+        full = np.zeros((height, width), dtype=np.uint8)
+        x, y, w, h = self.crop
+        fx, fy = width / self.frame_size[0], height / self.frame_size[1]
+        x0, y0 = round(x * fx), round(y * fy)
+        x1, y1 = max(x0 + 1, round((x + w) * fx)), max(y0 + 1, round((y + h) * fy))
+        full[y0:y1, x0:x1] = cv2.resize(fgmask, (x1 - x0, y1 - y0), interpolation=cv2.INTER_NEAREST)
+        return full
+
+
+def draw_detections(frame, detections):
+    """Draw a box and a label for every detection on the frame"""
+    for x, y, w, h, _ in detections.tolist():
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+        cv2.putText(frame, "Car detected", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.3, (0, 255, 0), 1,
+                    cv2.LINE_AA)
+    return frame
+
+
+def compose_display(frame, detector, fgmask, detections, scale=0.5, tracks=None, lines=()):
+    """Build the side by side view: original, foreground part and detections.
+
+    The frame is shrunk first, so the masking, drawing and stacking only
+    touch display sized images. When tracks are given, they are drawn with
+    their vehicle ids instead of the raw detections.
+    """
+    small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    height, width = small.shape[:2]
+    if detector.roi is not None:
+        cv2.polylines(small, [np.round(detector.roi * scale).astype(np.int32)], True, (255, 0, 0), 1)
+
+    forgroundPart = cv2.bitwise_and(small, small, mask=detector.display_mask(fgmask, width, height))
+    copied_frame = small.copy()
+    if tracks is None:
+        scaled = np.round(detections * (scale, scale, scale, scale, scale * scale)).astype(np.int32)
+        draw_detections(copied_frame, scaled)
+    else:
+        draw_tracks(copied_frame, tracks, scale)
+    draw_lines(copied_frame, lines, scale)
+    return np.hstack((small, forgroundPart, copied_frame))
@@ -0,0 +1,178 @@
+import argparse
+import glob
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from sketch import BLURS, SketchFilter
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".mpg", ".mpeg", ".wmv")
+
+# Sketch filter of the worker process, created once by _init_worker
+_sketch_filter = None
+_thresholds = None
+
+
+def _init_worker(lower, upper, blur, half):
+    global _sketch_filter, _thresholds
+    # Parallelism comes from the processes, OpenCV's own threads would only compete with them
+    cv2.setNumThreads(1)
+    _sketch_filter = SketchFilter(blur, half=half)
+    _thresholds = (lower, upper)
+
+
+def _sketch_image(path, out_path):
+    image = cv2.imread(path)
+    if image is None:
+        raise IOError(f"Could not read image: {path}")
+    if not cv2.imwrite(out_path, _sketch_filter(image, *_thresholds)):
+        raise IOError(f"Could not write image: {out_path}")
+    return path
+
+
+def _sketch_chunk(frames):
+    # The filter output is reused on the next call, so every frame is copied out
+    return [_sketch_filter(frame, *_thresholds).copy() for frame in frames]
+
+
+def collect_files(inputs):
+    """Expand directories and glob patterns into sorted image and video lists"""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.update(os.path.join(root, name) for name in files)
+        else:
+            paths.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+    images = sorted(p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS))
+    videos = sorted(p for p in paths if p.lower().endswith(VIDEO_EXTENSIONS))
+    return images, videos
+
+
+def output_path(path, output_dir, extension=None):
+    name, ext = os.path.splitext(os.path.basename(path))
+    return os.path.join(output_dir, f"{name}_sketch{extension or ext}")
+
+
+def check_outputs(images, videos, output_dir):
+    """Raise ValueError if two inputs would be written to the same file"""
+    # Two inputs with the same file name would overwrite each other's output
+    paths = {}
+    for path, extension in [(image, None) for image in images] + [(video, ".mp4") for video in videos]:
+        out_path = output_path(path, output_dir, extension)
+        if out_path in paths:
+            raise ValueError(f"{path} and {paths[out_path]} would both be written to {out_path}")
+        paths[out_path] = path
+
+
+def sketch_images(pool, images, output_dir):
+    """Sketch every image on the pool, yielding each path once it is written"""
+    futures = [pool.submit(_sketch_image, path, output_path(path, output_dir)) for path in images]
+    for path, future in zip(images, futures):
+        try:
+            yield path, future.result(), None
+        except Exception as e:
+            yield path, None, e
+
+
+def sketch_video(pool, path, out_path, chunk_size=16, max_pending=8):
+    """Sketch a video on the pool, writing the frames in their original order.
+
+    Frames are sent to the workers in chunks, and at most `max_pending`
+    chunks are in flight at once, so only a few chunks of the video are ever
+    held in memory no matter how long it is.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError(f"Could not open video: {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    writer = None
+    pending = deque()
+    frames = 0
+
+    def write(chunk):
+        nonlocal writer
+        for sketch in chunk:
+            if writer is None:
+                height, width = sketch.shape
+                writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+                if not writer.isOpened():
+                    raise IOError(f"Could not write video: {out_path}")
+            writer.write(cv2.cvtColor(sketch, cv2.COLOR_GRAY2BGR))
+
+    try:
+        while True:
+            chunk = []
+            while len(chunk) < chunk_size:
+                ret, frame = capture.read()
+                if not ret:
+                    break
+                chunk.append(frame)
+            if chunk:
+                pending.append(pool.submit(_sketch_chunk, chunk))
+                frames += len(chunk)
+            # Futures are written oldest first, which keeps the frames in order
+            while pending and (len(pending) >= max_pending or len(chunk) < chunk_size):
+                write(pending.popleft().result())
+            if len(chunk) < chunk_size:
+                break
+    finally:
+        for future in pending:
+            future.cancel()
+        capture.release()
+        if writer is not None:
+            writer.release()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sketch whole photo libraries and recorded videos")
+    parser.add_argument("inputs", nargs="+", help="image or video files, directories or glob patterns")
+    parser.add_argument("--output-dir", default="sketches", help="where to write the sketches")
+    parser.add_argument("--lower", type=int, default=12, help="lower Canny threshold")
+    parser.add_argument("--upper", type=int, default=55, help="upper Canny threshold")
+    parser.add_argument("--blur", choices=BLURS, default="gaussian", help="blur before edge detection")
+    parser.add_argument("--half", action="store_true", help="detect edges at half resolution")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=16, help="video frames sent to a worker at once")
+    args = parser.parse_args()
+
+    images, videos = collect_files(args.inputs)
+    if not images and not videos:
+        parser.error("no images or videos found")
+    try:
+        check_outputs(images, videos, args.output_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                             initargs=(args.lower, args.upper, args.blur, args.half)) as pool:
+        failed = 0
+        for path, _, error in sketch_images(pool, images, args.output_dir):
+            if error is not None:
+                failed += 1
+                print(f"FAILED {path}: {error}")
+        if images:
+            print(f"{len(images) - failed}/{len(images)} images in {time.perf_counter() - start:.1f}s")
+
+        max_pending = 2 * (args.workers or os.cpu_count() or 1)
+        for path in videos:
+            video_start = time.perf_counter()
+            out_path = output_path(path, args.output_dir, ".mp4")
+            try:
+                frames = sketch_video(pool, path, out_path, args.chunk_size, max_pending)
+            except Exception as e:
+                print(f"FAILED {path}: {e}")
+                continue
+            elapsed = time.perf_counter() - video_start
+            print(f"{path}: {frames} frames in {elapsed:.1f}s ({frames / elapsed:.1f} frames/s) -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+# The shared helpers live in common/ at the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.sources import open_source
+from sketch import BLURS, SketchFilter, sketch
+
+
+def frames_per_second(run, frames, seconds):
+    """Run over the frames for about `seconds` and return frames per second"""
+    for frame in frames:
+        run(frame)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for frame in frames:
+            run(frame)
+        count += len(frames)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sketch filter benchmark")
+    parser.add_argument("--source", help="video to take frames from (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=30, help="frames per resolution")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent on every measurement")
+    parser.add_argument("--lower", type=int, default=12)
+    parser.add_argument("--upper", type=int, default=55)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    variants = {"sketch()": lambda frame: sketch(frame, args.lower, args.upper)}
+    for blur in BLURS:
+        for half in (False, True):
+            sketch_filter = SketchFilter(blur, half=half)
+            name = f"{blur}{' half' if half else ''}"
+            variants[name] = lambda frame, f=sketch_filter: f(frame, args.lower, args.upper)
+
+    print(f"{'resolution':<12}{'variant':<18}{'frames/s':>10}")
+    for width, height in ((1280, 720), (1920, 1080)):
+        spec = args.source or f"synthetic:{width}x{height}:{args.frames}"
+        frames = []
+        for frame in open_source(spec):
+            frames.append(cv2.resize(frame, (width, height)) if frame.shape[:2] != (height, width) else frame)
+            if len(frames) == args.frames:
+                break
+        for name, run in variants.items():
+            fps = frames_per_second(run, frames, args.seconds)
+            print(f"{f'{height}p':<12}{name:<18}{fps:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,81 @@
+import argparse
+import os
+import sys
+
 import cv2
-import numpy as np
+
+# The shared helpers live in common/ at the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.governor import FrameGovernor, add_governor_arguments
+from common.sources import add_source_arguments, open_source
+from common.timing import Profiler
+from sketch import BLURS, RoiSketcher
+
+parser = argparse.ArgumentParser(description="Live sketch of a region of the video")
+add_source_arguments(parser)
+add_governor_arguments(parser)
+parser.add_argument("--blur", choices=BLURS, default="gaussian", help="blur before edge detection")
+parser.add_argument("--half", action="store_true", help="detect edges at half resolution")
+parser.add_argument("--workers", type=int, default=None, help="threads sketching the tiles of large regions")
+parser.add_argument("--metrics", help="write stage latencies to this file (.json, or .prom for Prometheus)")
+args = parser.parse_args()
+
+
+def select_rois(image):
+    # Draw as many regions as you like, ENTER after each one, ESC when done
+    rois = cv2.selectROIs("original", image, False, False)
+    cv2.destroyWindow("original")
+    return rois
+
 
 # Initializing video capture object
-capture = cv2.VideoCapture(0)
+capture = open_source(args.source, args.pace, args.loop)
+# Always hands out the newest frame, skipping some while the loop lags behind
+governor = FrameGovernor(capture, args.target_latency / 1000).start()
 
-while True:
-    ret, im = capture.read()
-    roi=cv2.selectROI("original",im,False,False)
-    cv2.destroyAllWindows()
-    break
+ret, im = governor.read()
+if not ret:
+    raise SystemExit("Could not read from the video source")
+
+# Sketches the selected regions, splitting large ones in tiles over a thread pool
+roi_sketcher = RoiSketcher(select_rois(im), 12, 55, args.blur, args.half, workers=args.workers)
+
+# Latency of every stage, printed when the loop ends
+profiler = Profiler("live_sketch_roi")
 
 while True:
-    ret, frame = capture.read()
+    with profiler.stage("capture"):
+        ret, frame = governor.read()
     if not ret:
         break
 
-    # For sketch effect
-    selected_roi = frame[int(roi[1]):int(roi[1]+roi[3]),
-                          int(roi[0]):int(roi[0]+roi[2])]
+    with profiler.stage("sketch"):
+        # 1. Convert to gray, add Gaussian blur, then apply Canny edge detection and thresholding
+        roi_sketcher(frame)
 
-    # 1. Convert to gray, add Gaussian blur, then apply Canny edge detection and thresholding
-    selected_roi_gray = cv2.cvtColor(selected_roi, cv2.COLOR_BGR2GRAY)
-    selected_roi_blur = cv2.GaussianBlur(selected_roi_gray, (7, 7), 0)
-    selected_roi_canny = cv2.Canny(selected_roi_blur, 12, 55)
-    _, selected_roi_thresh = cv2.threshold(selected_roi_canny, 50, 255, cv2.THRESH_BINARY_INV)
+    with profiler.stage("display"):
+        # Display original video
+        cv2.imshow('Original Video', frame)
+        key = cv2.waitKey(1)
+    governor.done()
+    profiler.tick()
 
-    selected_roi_color = cv2.cvtColor(selected_roi_thresh, cv2.COLOR_GRAY2BGR)
-    frame[int(roi[1]):int(roi[1]+roi[3]),
-          int(roi[0]):int(roi[0]+roi[2])] = selected_roi_color
-
-    # Display original video
-    cv2.imshow('Original Video', frame)
-
-    if cv2.waitKey(1) == ord('q'):
+    if key == ord('q'):
         break
+    elif key == ord('r'):  # Select new regions on a fresh frame, the capture keeps running
+        ret, im = governor.read()
+        if ret:
+            roi_sketcher.set_rois(select_rois(im))
+    elif key == ord('c'):  # Clear all regions
+        roi_sketcher.set_rois([])
 
+roi_sketcher.close()
+governor.stop()
 capture.release()
 cv2.destroyAllWindows()
+
+profiler.print_summary()
+governor.print_summary()
+if args.metrics:
+    profiler.dump(args.metrics)
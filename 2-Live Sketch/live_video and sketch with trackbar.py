@@ -1,20 +1,49 @@
+import argparse
+import os
+import sys
+
 import cv2
-import numpy as np
+
+# The shared helpers live in common/ at the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.governor import FrameGovernor, add_governor_arguments
+from common.sources import add_source_arguments, open_source
+from common.timing import Profiler
+from sketch import BLURS, SketchFilter
+
+parser = argparse.ArgumentParser(description="Live sketch with trackbars")
+add_source_arguments(parser)
+add_governor_arguments(parser)
+parser.add_argument("--blur", choices=BLURS, default="gaussian", help="blur before edge detection")
+parser.add_argument("--half", action="store_true", help="detect edges at half resolution")
+parser.add_argument("--metrics", help="write stage latencies to this file (.json, or .prom for Prometheus)")
+args = parser.parse_args()
+
 
 def nothing(x):
     pass
 
+
 # Initializing video capture object
-capture = cv2.VideoCapture(0)
+capture = open_source(args.source, args.pace, args.loop)
+# Always hands out the newest frame, skipping some while the loop lags behind
+governor = FrameGovernor(capture, args.target_latency / 1000).start()
 cv2.namedWindow('live_sketch')
 
 # Creating trackbars
 cv2.createTrackbar('lower', 'live_sketch', 0, 255, nothing)
 cv2.createTrackbar('Upper', 'live_sketch', 0, 255, nothing)
 
+# Sketch filter reusing its buffers from frame to frame
+sketch_filter = SketchFilter(args.blur, half=args.half)
+
+# Latency of every stage, printed when the loop ends
+profiler = Profiler("live_sketch")
 
 while True:
-    ret, frame = capture.read()
+    with profiler.stage("capture"):
+        ret, frame = governor.read()
     if not ret:
         break
 
@@ -24,22 +53,30 @@ while True:
 
   
     # 1. Convert to gray, add Gaussian blur, then apply Canny edge detection and thresholding
-    image = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    image = cv2.GaussianBlur(image, (7, 7), 0)
-    image = cv2.Canny(image, lower, upper)
-    ret, image = cv2.threshold(image, 50, 255, cv2.THRESH_BINARY_INV)
+    with profiler.stage("sketch"):
+        image = sketch_filter(frame, lower, upper)
 
    
 
 
 
-    # Display original video
-    cv2.imshow('Original Video', frame)
-    # Display sketch
-    cv2.imshow('live_sketch', image)
+    with profiler.stage("display"):
+        # Display original video
+        cv2.imshow('Original Video', frame)
+        # Display sketch
+        cv2.imshow('live_sketch', image)
+        key = cv2.waitKey(1)
+    governor.done()
+    profiler.tick()
 
-    if cv2.waitKey(1) == ord('q'):
+    if key == ord('q'):
         break
 
+governor.stop()
 capture.release()
 cv2.destroyAllWindows()
+
+profiler.print_summary()
+governor.print_summary()
+if args.metrics:
+    profiler.dump(args.metrics)
@@ -0,0 +1,171 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+BLURS = ("gaussian", "box", "separable")
+
+# Extra rows read around every tile, so the blur and Canny's gradients see
+# the same neighbourhood as on the whole region. Canny's hysteresis follows
+# edges across the whole image though, so no overlap makes the seams exact:
+# a few pixels along them can differ from sketching the region in one piece
+TILE_OVERLAP = 8
+
+
+def sketch(image, lower, upper):
+    """Convert to gray, add Gaussian blur, then apply Canny edge detection and thresholding"""
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    image = cv2.GaussianBlur(image, (7, 7), 0)
+    image = cv2.Canny(image, lower, upper)
+    _, image = cv2.threshold(image, 50, 255, cv2.THRESH_BINARY_INV)
+    return image
+
+
+class SketchFilter:
+    """The sketch() chain with its buffers allocated once per resolution.
+
+    Every step writes into a preallocated buffer through dst=, so a running
+    filter allocates nothing per frame. The result is one of those buffers
+    and is overwritten by the next call, copy it to keep it.
+
+    blur is "gaussian" (same as sketch()), "box" (cheapest) or "separable"
+    (a 1D Gaussian kernel applied along rows then columns). With half=True
+    the blur and Canny run at half resolution and the edges are scaled back
+    up, which costs about a quarter of the work for slightly thicker lines.
+    """
+
+    def __init__(self, blur="gaussian", ksize=7, half=False):
+        if blur not in BLURS:
+            raise ValueError(f"Unknown blur: {blur}")
+        self.blur = blur
+        self.ksize = ksize
+        self.half = half
+        self.kernel = cv2.getGaussianKernel(ksize, 0)
+        self.shape = None
+
+    def _allocate(self, shape):
+        height, width = shape[:2]
+        self.shape = shape
+        self.size = (width, height)
+        # A region one pixel tall or wide still has one pixel at half resolution
+        work = (max(1, height // 2), max(1, width // 2)) if self.half else (height, width)
+        self.gray = np.empty((height, width), dtype=np.uint8)
+        self.small = np.empty(work, dtype=np.uint8) if self.half else self.gray
+        self.blurred = np.empty(work, dtype=np.uint8)
+        self.edges = np.empty(work, dtype=np.uint8)
+        self.full_edges = np.empty((height, width), dtype=np.uint8) if self.half else self.edges
+        self.output = np.empty((height, width), dtype=np.uint8)
+        self.output_bgr = np.empty((height, width, 3), dtype=np.uint8)
+
+    def __call__(self, image, lower, upper, to_bgr=False):
+        """Sketch a BGR image, as a single channel image or as BGR with to_bgr=True"""
+        if image.shape != self.shape:
+            self._allocate(image.shape)
+
+        cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        if self.half:
+            cv2.resize(self.gray, (self.small.shape[1], self.small.shape[0]), dst=self.small,
+                       interpolation=cv2.INTER_AREA)
+
+        if self.blur == "gaussian":
+            cv2.GaussianBlur(self.small, (self.ksize, self.ksize), 0, dst=self.blurred)
+        elif self.blur == "box":
+            cv2.blur(self.small, (self.ksize, self.ksize), dst=self.blurred)
+        else:
+            cv2.sepFilter2D(self.small, -1, self.kernel, self.kernel, dst=self.blurred)
+
+        cv2.Canny(self.blurred, lower, upper, edges=self.edges)
+        if self.half:
+            cv2.resize(self.edges, self.size, dst=self.full_edges, interpolation=cv2.INTER_NEAREST)
+        cv2.threshold(self.full_edges, 50, 255, cv2.THRESH_BINARY_INV, dst=self.output)
+
+        if not to_bgr:
+            return self.output
+        cv2.cvtColor(self.output, cv2.COLOR_GRAY2BGR, dst=self.output_bgr)
+        return self.output_bgr
+
+
+class _Tile:
+    """One band of a region: the rows it reads, the rows it writes and its filter"""
+
+    def __init__(self, x0, x1, read, write, sketch_filter):
+        self.read = (slice(read[0], read[1]), slice(x0, x1))
+        self.write = (slice(write[0], write[1]), slice(x0, x1))
+        self.keep = slice(write[0] - read[0], write[1] - read[0])
+        self.sketch_filter = sketch_filter
+
+
+class RoiSketcher:
+    """Sketches several regions of interest of a frame, in place.
+
+    The region bounds are worked out once when the regions are set, not on
+    every frame. Regions larger than `tile_pixels` are split into horizontal
+    bands that are sketched in parallel on a thread pool (OpenCV releases
+    the GIL), each with its own SketchFilter. The bands overlap a little,
+    but edges that Canny would have followed across a seam can still end
+    differently there; tile_pixels=None sketches every region in one piece,
+    exactly like sketch(). The single channel sketches are broadcast straight
+    into the BGR frame, without a 3-channel copy.
+    """
+
+    def __init__(self, rois=(), lower=12, upper=55, blur="gaussian", half=False, tile_pixels=640 * 360,
+                 workers=None):
+        self.lower = lower
+        self.upper = upper
+        self.blur = blur
+        self.half = half
+        self.tile_pixels = tile_pixels
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ThreadPoolExecutor(self.workers) if self.workers > 1 else None
+        self.rois = []
+        self.tiles = []
+        self.frame_shape = None
+        self.set_rois(rois)
+
+    def set_rois(self, rois):
+        """Replace the regions with (x, y, w, h) rectangles, e.g. from cv2.selectROIs"""
+        self.rois = [tuple(int(v) for v in roi) for roi in rois if roi[2] > 0 and roi[3] > 0]
+        self.frame_shape = None
+
+    def _build_tiles(self, shape):
+        height, width = shape[:2]
+        self.frame_shape = shape
+        self.tiles = []
+        for x, y, w, h in self.rois:
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + w, width), min(y + h, height)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            bands = 1
+            if self.tile_pixels:
+                bands = min(self.workers, max(1, math.ceil((x1 - x0) * (y1 - y0) / self.tile_pixels)))
+            edges = np.linspace(y0, y1, bands + 1).round().astype(int)
+            for top, bottom in zip(edges[:-1], edges[1:]):
+                read = (max(top - TILE_OVERLAP, y0), min(bottom + TILE_OVERLAP, y1)) if bands > 1 else (top, bottom)
+                self.tiles.append(_Tile(x0, x1, read, (top, bottom), SketchFilter(self.blur, half=self.half)))
+
+    def _sketch_tile(self, tile, frame):
+        return tile.sketch_filter(frame[tile.read], self.lower, self.upper)
+
+    def __call__(self, frame):
+        """Replace every region of the frame by its sketch"""
+        if frame.shape != self.frame_shape:
+            self._build_tiles(frame.shape)
+        if not self.tiles:
+            return frame
+
+        # Every tile is sketched before any is written, since tiles read a few rows of their neighbours
+        if self.pool is not None and len(self.tiles) > 1:
+            sketches = list(self.pool.map(self._sketch_tile, self.tiles, [frame] * len(self.tiles)))
+        else:
+            sketches = [self._sketch_tile(tile, frame) for tile in self.tiles]
+
+        for tile, sketch_image in zip(self.tiles, sketches):
+            np.copyto(frame[tile.write], sketch_image[tile.keep, :, None])
+        return frame
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
@@ -1,124 +1,182 @@
+import argparse
+import os
+import sys
 import cv2
 import mediapipe as mp
-import pyautogui
 import numpy as np
-import math
 import time
-from collections import deque
+
+# The shared helpers live in common/ at the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.governor import FrameGovernor, add_governor_arguments
+from common.sources import add_source_arguments, open_source
+from common.timing import Profiler
+from cursor_filters import AXIS_FILTERS, parse_settings
+from hand_control import HAND_KEYS, ActionSink, HandController, LogSink, MouseSink, default_hand_key, parse_sinks
+from hand_tracking import AsyncHandTracker, CursorMover, CursorPredictor, RoiHandDetector
+from input_backend import BACKENDS, InputQueue, create_backend
+from landmark_recorder import LandmarkRecorder
+
+parser = argparse.ArgumentParser(description="Control the mouse with hand gestures")
+add_source_arguments(parser)
+add_governor_arguments(parser)
+parser.add_argument("--cursor-rate", type=float, default=60, help="cursor updates per second (default: 60)")
+parser.add_argument("--cursor-mode", choices=("predict", "interpolate"), default="predict",
+                    help="how the cursor moves between hand tracking results")
+parser.add_argument("--cursor-filter", choices=sorted(AXIS_FILTERS), default="one-euro",
+                    help="smoothing of the fingertip position (default: one-euro)")
+parser.add_argument("--filter-settings", default="",
+                    help='filter settings, one value or x:y per axis, e.g. "min_cutoff=1,beta=0.05:0.1"')
+parser.add_argument("--trail-length", type=int, default=50, help="cursor points kept in the laser trail (default: 50)")
+parser.add_argument("--trail-fade", action="store_true", help="fade out the older part of the laser trail")
+parser.add_argument("--max-hands", type=int, default=1, help="hands tracked at once (default: 1)")
+parser.add_argument("--hand-key", choices=HAND_KEYS,
+                    help="tell hands apart by left/right, or by following them (e.g. two users' right hands); "
+                         "default: single with one hand, handedness with more")
+parser.add_argument("--hand-sinks",
+                    help='what every hand drives, e.g. "Right=mouse,Left=log", '
+                         'or "0=mouse,*=none" with --hand-key track')
+parser.add_argument("--track-roi", action="store_true",
+                    help="run hand tracking on a crop around the last hand position instead of the full frame")
+parser.add_argument("--input-backend", choices=BACKENDS, default="pyautogui",
+                    help="where mouse events go: the system (pyautogui), recorded in memory, or nowhere")
+parser.add_argument("--screen-size", default="1920x1080", help="screen size for the record and none backends")
+parser.add_argument("--record", help="record the hand landmarks to this .npy file, for replay_landmarks.py")
+parser.add_argument("--metrics", help="write stage latencies to this file (.json, or .prom for Prometheus)")
+args = parser.parse_args()
 
 # Initialize MediaPipe Hands
-hands_detector = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=1, min_detection_confidence=0.7)
+hands_detector = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=args.max_hands,
+                                          min_detection_confidence=0.7)
 drawing_utils = mp.solutions.drawing_utils
+if args.track_roi:
+    # Crops around the hand, searches the whole (downsized) frame only when it is lost,
+    # or every 10 frames for hands that are not in view yet
+    hands_detector = RoiHandDetector(hands_detector, full_every=10 if args.max_hands > 1 else None)
+
+# Mouse events are sent by the input thread, so the loops never wait for the system
+input_backend = create_backend(args.input_backend, tuple(int(v) for v in args.screen_size.split("x")))
+input_queue = InputQueue(input_backend).start()
 
 # Screen dimensions
-screen_width, screen_height = pyautogui.size()
+screen_width, screen_height = input_queue.size()
 
 # Webcam capture
-capture = cv2.VideoCapture(0)
-
-# Buffers and state
-trail = []
-position_buffer = deque(maxlen=5)
-dragging = False
-last_click_time = 0
-last_right_click_time = 0
-
-# Gesture cooldown in seconds
-CLICK_COOLDOWN = 1.0
-RIGHT_CLICK_COOLDOWN = 1.0
-
-def distance(p1, p2):
-    return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
-
-def smooth_position(pos_buffer):
-    if not pos_buffer:
-        return None
-    avg_x = int(sum([p[0] for p in pos_buffer]) / len(pos_buffer))
-    avg_y = int(sum([p[1] for p in pos_buffer]) / len(pos_buffer))
-    return (avg_x, avg_y)
+capture = open_source(args.source, args.pace, args.loop)
+# Always hands out the newest frame, skipping some while the loop lags behind
+governor = FrameGovernor(capture, args.target_latency / 1000).start()
+
+# Per-hand state, gestures from the rule table in gestures.py and the
+# fingertip filter (see benchmark_cursor.py for choosing its settings)
+if args.hand_sinks:
+    hand_sinks = parse_sinks(args.hand_sinks)
+elif args.max_hands == 1:
+    hand_sinks = {"*": "mouse"}
+else:
+    # The right hand (or the first tracked one) drives the mouse, the others are logged
+    hand_sinks = {"Right": "mouse", "0": "mouse", "*": "log"}
+
+# Latency of every stage, printed when the loop ends
+profiler = Profiler("virtual_mouse")
+
+# Hand landmarks are computed on a worker thread, and the cursor moves on its
+# own thread at a steady rate, predicting between landmark results
+tracker = AsyncHandTracker(hands_detector, profiler).start()
+predictor = CursorPredictor(args.cursor_mode)
+cursor = CursorMover(predictor.position, input_queue.move, args.cursor_rate).start()
+mouse_sink = MouseSink(input_queue, predictor)
+
+
+def sink_for(key):
+    name = hand_sinks.get(key, hand_sinks.get("*", "none"))
+    if name == "mouse":
+        return mouse_sink
+    return LogSink(key) if name == "log" else ActionSink()
+
+
+controller = HandController(sink_for, key_by=args.hand_key or default_hand_key(args.max_hands),
+                            filter_kind=args.cursor_filter, filter_settings=parse_settings(args.filter_settings),
+                            trail_length=args.trail_length, trail_fade=args.trail_fade)
+last_sequence = 0
+visible = []
+recorder = LandmarkRecorder(args.record, args.max_hands) if args.record else None
 
 while True:
-    ret, frame = capture.read()
+    with profiler.stage("capture"):
+        ret, frame = governor.read()
     if not ret:
         break
 
-    frame = cv2.flip(frame, 1)
-    frame_height, frame_width, _ = frame.shape
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    output = hands_detector.process(rgb_frame)
-    hands = output.multi_hand_landmarks
+    with profiler.stage("preprocess"):
+        frame = cv2.flip(frame, 1)
+        frame_height, frame_width, _ = frame.shape
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-    gesture_text = ""
+    # Inference runs on the tracker thread, the loop carries on with the last result
+    tracker.submit(rgb_frame)
+    result = tracker.latest()
+    if tracker.error is not None:
+        print(f"hand tracking failed, stopping: {tracker.error!r}")
+        break
+    hands = result.hands
+    new_result = result.sequence != last_sequence
+    last_sequence = result.sequence
+
+    gestures_start = time.perf_counter()
+    if new_result:
+        if recorder is not None:
+            recorder.write(result.timestamp, hands, result.handedness, (frame_width, frame_height))
+        # All hands of the result in one batch, each with its own state and sink
+        visible = controller.update(hands, result.handedness, result.timestamp, (frame_width, frame_height),
+                                    (screen_width, screen_height))
 
     if hands:
         for hand in hands:
             drawing_utils.draw_landmarks(frame, hand)
-            landmarks = hand.landmark
-            points = {}
-
-            for id, lm in enumerate(landmarks):
-                x, y = int(lm.x * frame_width), int(lm.y * frame_height)
-                points[id] = (x, y)
-
-            index_tip = points[8]
-            thumb_tip = points[4]
-            middle_tip = points[12]
-
-            # Smooth cursor position
-            position_buffer.append(index_tip)
-            smoothed_pos = smooth_position(position_buffer)
-
-            if smoothed_pos:
-                screen_x = screen_width / frame_width * smoothed_pos[0]
-                screen_y = screen_height / frame_height * smoothed_pos[1]
-                pyautogui.moveTo(screen_x, screen_y)
-                trail.append(smoothed_pos)
-
-            # Drag & Drop
-            if distance(index_tip, thumb_tip) < 40:
-                if not dragging and (time.time() - last_click_time > CLICK_COOLDOWN):
-                    pyautogui.mouseDown()
-                    dragging = True
-                    last_click_time = time.time()
-                gesture_text = "Dragging"
-            else:
-                if dragging:
-                    pyautogui.mouseUp()
-                    dragging = False
-
-            # Right Click
-            if distance(thumb_tip, middle_tip) < 40:
-                if time.time() - last_right_click_time > RIGHT_CLICK_COOLDOWN:
-                    pyautogui.rightClick()
-                    gesture_text = "Right Click"
-                    last_right_click_time = time.time()
-
-            # Scroll
-            if distance(index_tip, middle_tip) < 30:
-                gesture_text = "Scrolling"
-                if len(trail) > 1:
-                    dy = trail[-1][1] - trail[-2][1]
-                    if abs(dy) > 2:
-                        pyautogui.scroll(-int(dy))
 
+        for i, state in enumerate(visible):
             # Draw laser trail
-            for i in range(1, len(trail)):
-                if trail[i - 1] is None or trail[i] is None:
-                    continue
-                cv2.line(frame, trail[i - 1], trail[i], (0, 0, 255), 2)
+            state.trail.draw(frame)
 
             # Display gesture name
-            if gesture_text:
-                cv2.putText(frame, f"Gesture: {gesture_text}", (10, 50),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 3)
-
-    # Limit trail length
-    if len(trail) > 50:
-        trail = trail[-50:]
-
-    cv2.imshow("🖱️ Virtual Mouse", frame)
-    if cv2.waitKey(1) == ord('q'):
+            if state.gesture_text:
+                name = "Gesture" if args.max_hands == 1 else state.key
+                label = f"{name}: {state.gesture_text}"
+                cv2.putText(frame, label, (10, 50 + 40 * i), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 3)
+
+    profiler.record("gestures", time.perf_counter() - gestures_start)
+
+    with profiler.stage("display"):
+        cv2.imshow("🖱️ Virtual Mouse", frame)
+        key = cv2.waitKey(1)
+    governor.done()
+    profiler.tick()
+    if key == ord('q'):
+        break
+    # Stop like pyautogui's fail-safe used to, e.g. when the cursor is moved into a screen corner
+    if input_queue.error is not None:
+        print(f"input backend failed, stopping: {input_queue.error!r}")
         break
 
+controller.release_all()
+cursor.stop()
+tracker.stop()
+input_queue.stop()
+if recorder is not None:
+    recorder.close()
+    print(f"recorded {recorder.rows} hand tracking results to {args.record}")
+governor.stop()
 capture.release()
 cv2.destroyAllWindows()
+
+profiler.print_summary()
+governor.print_summary()
+print("input events: {queued} queued, {coalesced} moves coalesced, {executed} sent, {failed} failed, "
+      "p99 delay {latency_p99_ms:.1f} ms".format(**input_queue.stats()))
+if args.input_backend == "record":
+    print("recorded:", dict(input_backend.counts))
+if args.track_roi:
+    print("hand tracking: {crops} crops, {full_frames} full frames, hand lost {lost} times".format(**hands_detector.stats()))
+if args.metrics:
+    profiler.dump(args.metrics)
@@ -0,0 +1,157 @@
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from cursor_filters import PointFilter, parse_settings
+from landmark_recorder import load_recording
+
+# Settings tried for every filter when none are given on the command line
+GRID = {
+    "average": {"size": (3, 5, 9)},
+    "one-euro": {"min_cutoff": (0.5, 1.0, 2.0), "beta": (0.01, 0.05, 0.2)},
+    "kalman": {"process_noise": (1e3, 1e4, 1e5), "measurement_noise": (1.0, 4.0, 16.0)},
+}
+
+
+def recording_trace(recording):
+    """The index fingertip of the first hand in pixels, from the results of a recording that have a hand"""
+    rows = recording[np.asarray(recording["count"]) > 0]
+    tip = np.asarray(rows["landmarks"][:, 0, 8, :2], dtype=np.float64)
+    sizes = np.stack([rows["width"], rows["height"]], axis=1)
+    return np.asarray(rows["timestamp"], dtype=np.float64), tip * sizes
+
+
+def load_trace(path):
+    """Load a cursor trace as (timestamps, points) from a .npy or .csv file of t, x, y rows,
+    or from a hand recording of the virtual mouse (--record)"""
+    if path.endswith(".npy"):
+        data = np.load(path, mmap_mode="r")
+        if data.dtype.names:
+            return recording_trace(load_recording(path))
+        data = np.asarray(data)
+    else:
+        with open(path) as f:
+            header = not f.readline()[:1].isdigit()
+        data = np.loadtxt(path, delimiter=",", ndmin=2, comments="#", skiprows=int(header))
+    if data.ndim != 2 or data.shape[1] < 3:
+        raise ValueError(f"Expected rows of t, x, y in {path}")
+    return data[:, 0], data[:, 1:3]
+
+
+def synthetic_trace(seconds=60.0, fps=30.0, noise=2.0, seed=0):
+    """A hand that moves between random targets and rests in between, with landmark noise.
+
+    Returns (timestamps, noisy points, true points).
+    """
+    rng = np.random.default_rng(seed)
+    timestamps = np.arange(0.0, seconds, 1.0 / fps)
+    keys_t, keys_p = [0.0], [rng.uniform(100, 540, 2)]
+    while keys_t[-1] < seconds:
+        # A move of 0.2-0.8 s followed by a rest of 0.3-1.5 s
+        keys_t += [keys_t[-1] + rng.uniform(0.2, 0.8), 0.0]
+        keys_p += [rng.uniform(100, 540, 2), None]
+        keys_t[-1] = keys_t[-2] + rng.uniform(0.3, 1.5)
+        keys_p[-1] = keys_p[-2]
+    keys_t, keys_p = np.array(keys_t), np.array(keys_p)
+    # Smoothstep between key points, like a real reach
+    index = np.clip(np.searchsorted(keys_t, timestamps, side="right") - 1, 0, len(keys_t) - 2)
+    u = (timestamps - keys_t[index]) / (keys_t[index + 1] - keys_t[index])
+    u = (u * u * (3 - 2 * u))[:, None]
+    truth = keys_p[index] * (1 - u) + keys_p[index + 1] * u
+    return timestamps, truth + rng.normal(0, noise, truth.shape), truth
+
+
+def run_filter(point_filter, timestamps, points):
+    filtered = np.empty_like(points)
+    start = time.perf_counter()
+    for i, (t, point) in enumerate(zip(timestamps.tolist(), points.tolist())):
+        filtered[i] = point_filter(point, t)
+    return filtered, (time.perf_counter() - start) / len(points)
+
+
+def lag(timestamps, filtered, reference, max_lag=0.3, step=0.001):
+    """The delay (s) that best lines up the filtered trace with the reference"""
+    best, best_error = 0.0, np.inf
+    valid = timestamps - timestamps[0] >= max_lag
+    for delay in np.arange(0.0, max_lag, step):
+        shifted = np.stack([np.interp(timestamps[valid] - delay, timestamps, reference[:, i]) for i in range(2)], 1)
+        error = np.mean((filtered[valid] - shifted) ** 2)
+        if error < best_error:
+            best, best_error = delay, error
+    return best
+
+
+def still_mask(timestamps, reference, speed=30.0, window=9, settle=0.3):
+    """Frames where the (smoothed) reference has moved slower than `speed` px/s for `settle` seconds.
+
+    Waiting for the hand to settle keeps a slow filter still catching up
+    after a move from counting as jitter.
+    """
+    kernel = np.ones(window) / window
+    smooth = np.stack([np.convolve(reference[:, i], kernel, mode="same") for i in range(2)], 1)
+    velocity = np.linalg.norm(np.gradient(smooth, timestamps, axis=0), axis=1)
+    moving = velocity >= speed
+    moving[:window] = moving[-window:] = True
+    # Time since the last moving frame, for every frame
+    last_moving = np.maximum.accumulate(np.where(moving, np.arange(len(moving)), 0))
+    return timestamps - timestamps[last_moving] >= settle
+
+
+def evaluate(point_filter, timestamps, points, truth=None):
+    filtered, per_update = run_filter(point_filter, timestamps, points)
+    reference = points if truth is None else truth
+    still = still_mask(timestamps, reference)
+    steps = np.linalg.norm(np.diff(filtered, axis=0), axis=1)
+    result = {
+        "lag_ms": 1000 * lag(timestamps, filtered, reference),
+        "jitter_px": float(np.sqrt(np.mean(steps[still[1:]] ** 2))) if still[1:].any() else float("nan"),
+        "update_us": 1e6 * per_update,
+    }
+    if truth is not None:
+        result["error_px"] = float(np.sqrt(np.mean(np.sum((filtered - truth) ** 2, axis=1))))
+    return result
+
+
+def candidates(kinds, settings):
+    for kind in kinds:
+        if settings is not None:
+            yield kind, settings
+            continue
+        names = list(GRID[kind])
+        for values in itertools.product(*(GRID[kind][name] for name in names)):
+            yield kind, dict(zip(names, values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay cursor traces through the cursor filters, lag vs jitter")
+    parser.add_argument("traces", nargs="*",
+                        help="hand recordings (--record), or .npy or .csv files of t, x, y rows (default: a synthetic trace)")
+    parser.add_argument("--filter", choices=sorted(GRID), nargs="+", default=list(GRID), help="filters to try")
+    parser.add_argument("--settings", help='try only these settings, e.g. "min_cutoff=1,beta=0.05:0.1"')
+    parser.add_argument("--noise", type=float, default=2.0, help="landmark noise of the synthetic trace in px")
+    args = parser.parse_args()
+
+    settings = parse_settings(args.settings) if args.settings else None
+    if args.traces:
+        traces = [(path, *load_trace(path), None) for path in args.traces]
+    else:
+        traces = [("synthetic", *synthetic_trace(noise=args.noise))]
+
+    for name, timestamps, points, truth in traces:
+        raw = evaluate(PointFilter("average", size=1), timestamps, points, truth)
+        print(f"{name}: {len(points)} points, unfiltered jitter {raw['jitter_px']:.2f} px")
+        header = f"{'filter':<10}{'settings':<44}{'lag ms':>8}{'jitter px':>11}{'us/update':>11}"
+        print(header + (f"{'error px':>10}" if truth is not None else ""))
+        for kind, values in candidates(args.filter, settings):
+            result = evaluate(PointFilter(kind, **values), timestamps, points, truth)
+            text = ",".join(f"{k}={v:g}" if not isinstance(v, tuple) else f"{k}={v[0]:g}:{v[1]:g}"
+                            for k, v in values.items())
+            line = f"{kind:<10}{text:<44}{result['lag_ms']:>8.0f}{result['jitter_px']:>11.2f}{result['update_us']:>11.1f}"
+            print(line + (f"{result['error_px']:>10.2f}" if truth is not None else ""))
+        print()
+
+
+if __name__ == "__main__":
+    main()
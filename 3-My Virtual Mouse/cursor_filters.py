@@ -0,0 +1,153 @@
+import math
+from collections import deque
+
+
+def _per_axis(value):
+    """A setting for both axes, either one value for both or an (x, y) pair"""
+    if isinstance(value, (tuple, list)):
+        return value[0], value[1]
+    return value, value
+
+
+class OneEuroAxis:
+    """One-Euro filter for a single coordinate (Casiez et al., CHI 2012).
+
+    A low-pass filter whose cutoff frequency rises with the speed of the
+    signal: `min_cutoff` (Hz) sets the smoothing when still, `beta` how fast
+    the cutoff opens up with speed, in the units of the coordinate.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.speed = 0.0
+        self.time = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, value, timestamp):
+        if self.value is None:
+            self.value, self.time = value, timestamp
+            return value
+        dt = timestamp - self.time
+        if dt <= 0:
+            return self.value
+        self.time = timestamp
+        a = self._alpha(self.d_cutoff, dt)
+        self.speed += a * ((value - self.value) / dt - self.speed)
+        a = self._alpha(self.min_cutoff + self.beta * abs(self.speed), dt)
+        self.value += a * (value - self.value)
+        return self.value
+
+
+class KalmanAxis:
+    """Constant velocity Kalman filter for a single coordinate.
+
+    The state is position and velocity. `process_noise` is the spectral
+    density of the random acceleration (units²/s³): higher follows turns
+    faster. `measurement_noise` is the variance of a measurement (units²):
+    higher smooths more.
+    """
+
+    def __init__(self, process_noise=5e4, measurement_noise=4.0):
+        self.q = process_noise
+        self.r = measurement_noise
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.time = None
+
+    def __call__(self, value, timestamp):
+        if self.value is None:
+            self.value, self.velocity, self.time = value, 0.0, timestamp
+            # Unknown velocity to begin with
+            self.p00, self.p01, self.p11 = self.r, 0.0, 1e6
+            return value
+        dt = timestamp - self.time
+        if dt <= 0:
+            return self.value
+        self.time = timestamp
+
+        # Predict: x = F x, P = F P F' + Q, with F = [[1, dt], [0, 1]]
+        self.value += self.velocity * dt
+        q = self.q
+        p00 = self.p00 + dt * (2 * self.p01 + dt * self.p11) + q * dt ** 3 / 3
+        p01 = self.p01 + dt * self.p11 + q * dt ** 2 / 2
+        p11 = self.p11 + q * dt
+
+        # Update with the measured position
+        s = p00 + self.r
+        k0, k1 = p00 / s, p01 / s
+        residual = value - self.value
+        self.value += k0 * residual
+        self.velocity += k1 * residual
+        self.p00, self.p01, self.p11 = (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01
+        return self.value
+
+
+class MovingAverageAxis:
+    """Mean of the last `size` values, the smoothing the virtual mouse started with"""
+
+    def __init__(self, size=5):
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+
+    def reset(self):
+        self.values.clear()
+        self.total = 0.0
+
+    def __call__(self, value, timestamp):
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        return self.total / len(self.values)
+
+
+AXIS_FILTERS = {"one-euro": OneEuroAxis, "kalman": KalmanAxis, "average": MovingAverageAxis}
+
+
+class PointFilter:
+    """Filters (x, y) points with one filter per axis.
+
+    Every keyword setting is either one value for both axes or an (x, y)
+    pair, e.g. PointFilter("one-euro", beta=(0.05, 0.1)) reacts faster to
+    vertical movement. Every update costs the same, however long it runs.
+    """
+
+    def __init__(self, kind="one-euro", **settings):
+        if kind not in AXIS_FILTERS:
+            raise ValueError(f"Unknown cursor filter: {kind}")
+        self.kind = kind
+        per_axis = {name: _per_axis(value) for name, value in settings.items()}
+        self.axes = [AXIS_FILTERS[kind](**{name: pair[i] for name, pair in per_axis.items()}) for i in range(2)]
+
+    def __call__(self, point, timestamp):
+        return self.axes[0](point[0], timestamp), self.axes[1](point[1], timestamp)
+
+    def reset(self):
+        for axis in self.axes:
+            axis.reset()
+
+
+def parse_settings(text):
+    """Parse "name=value,name=x:y" into PointFilter keyword settings"""
+    settings = {}
+    for item in filter(None, (text or "").split(",")):
+        name, _, value = item.partition("=")
+        values = [float(v) for v in value.split(":")]
+        if not name or len(values) not in (1, 2):
+            raise ValueError(f"Bad filter setting: {item}")
+        if name == "size":
+            values = [int(v) for v in values]
+        settings[name.strip().replace("-", "_")] = values[0] if len(values) == 1 else tuple(values)
+    return settings
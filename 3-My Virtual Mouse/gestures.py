@@ -0,0 +1,107 @@
+import numpy as np
+
+# MediaPipe hand landmark indices
+LANDMARKS = {
+    "wrist": 0,
+    "thumb_cmc": 1, "thumb_mcp": 2, "thumb_ip": 3, "thumb_tip": 4,
+    "index_mcp": 5, "index_pip": 6, "index_dip": 7, "index_tip": 8,
+    "middle_mcp": 9, "middle_pip": 10, "middle_dip": 11, "middle_tip": 12,
+    "ring_mcp": 13, "ring_pip": 14, "ring_dip": 15, "ring_tip": 16,
+    "pinky_mcp": 17, "pinky_pip": 18, "pinky_dip": 19, "pinky_tip": 20,
+}
+
+# Gesture rules: every condition of a gesture must hold. A condition compares
+# the distance between two landmarks with a threshold in hand sizes (the
+# wrist to middle finger knuckle distance), so it holds whether the hand is
+# near or far from the camera. 40 and 30 px used to be the thresholds for a
+# hand about 90 px in size.
+GESTURE_RULES = (
+    ("drag", (("thumb_tip", "index_tip", "<", 0.45),)),
+    ("right_click", (("thumb_tip", "middle_tip", "<", 0.45),)),
+    ("scroll", (("index_tip", "middle_tip", "<", 0.33),)),
+)
+
+
+def landmarks_array(hand, width, height):
+    """A MediaPipe hand as a (21, 3) array, x and y in pixels and z on the scale of x"""
+    points = np.array([(lm.x, lm.y, lm.z) for lm in hand.landmark], dtype=np.float32)
+    points *= (width, height, width)
+    return points
+
+
+def pairwise_distances(points):
+    """All (21, 21) distances between the landmarks in the image plane, for one hand or an (H, 21, 3) batch"""
+    xy = points[..., :2]
+    diff = xy[..., :, None, :] - xy[..., None, :, :]
+    return np.sqrt(np.einsum("...k,...k->...", diff, diff))
+
+
+def with_thresholds(rules, thresholds):
+    """A copy of the rules with new thresholds, {gesture: threshold} for all conditions of a gesture"""
+    unknown = set(thresholds) - {name for name, _ in rules}
+    if unknown:
+        raise ValueError(f"Unknown gestures: {', '.join(sorted(unknown))}")
+    return tuple((name, tuple((a, b, op, thresholds.get(name, threshold)) for a, b, op, threshold in conditions))
+                 for name, conditions in rules)
+
+
+class GestureEngine:
+    """Evaluates a table of gesture rules on hands with a fixed number of array operations.
+
+    The conditions of all gestures are flattened into index and threshold
+    arrays once, so adding gestures adds rows to those arrays rather than
+    Python work per frame. Several hands are evaluated together as one
+    (H, 21, 3) batch.
+    """
+
+    def __init__(self, rules=GESTURE_RULES, size_pair=("wrist", "middle_mcp")):
+        self.names = [name for name, _ in rules]
+        first, second, thresholds, signs, owners = [], [], [], [], []
+        for index, (name, conditions) in enumerate(rules):
+            if not conditions:
+                raise ValueError(f"Gesture without conditions: {name}")
+            for a, b, op, threshold in conditions:
+                if op not in ("<", ">"):
+                    raise ValueError(f"Unknown comparison in {name}: {op}")
+                first.append(LANDMARKS[a])
+                second.append(LANDMARKS[b])
+                thresholds.append(threshold)
+                signs.append(1.0 if op == "<" else -1.0)
+                owners.append(index)
+        self.first = np.array(first)
+        self.second = np.array(second)
+        self.thresholds = np.array(thresholds, dtype=np.float32)
+        self.signs = np.array(signs, dtype=np.float32)
+        self.owners = np.array(owners)
+        self.needed = np.bincount(self.owners, minlength=len(self.names))
+        # Which gesture every condition belongs to, to count the conditions held per gesture
+        self.membership = np.zeros((len(self.owners), len(self.names)), dtype=np.float32)
+        self.membership[np.arange(len(self.owners)), self.owners] = 1
+        self.size_pair = (LANDMARKS[size_pair[0]], LANDMARKS[size_pair[1]])
+
+    def hand_size(self, distances):
+        return np.maximum(distances[..., self.size_pair[0], self.size_pair[1]], 1e-6)
+
+    def evaluate(self, points):
+        """Return (active, distances): a bool per gesture and the distances in hand sizes.
+
+        For an (H, 21, 3) batch, active is (H, gestures) and distances (H, 21, 21).
+        """
+        distances = pairwise_distances(points)
+        distances /= self.hand_size(distances)[..., None, None]
+        held = self.signs * (distances[..., self.first, self.second] - self.thresholds) < 0
+        active = held.astype(np.float32) @ self.membership == self.needed
+        return active, distances
+
+    def __call__(self, points):
+        """Return the set of gesture names whose conditions all hold"""
+        active, _ = self.evaluate(points)
+        return {self.names[i] for i in np.flatnonzero(active)}
+
+    def batch(self, points):
+        """Return the set of gesture names of every hand of an (H, 21, 3) batch"""
+        active, _ = self.evaluate(points)
+        result = [set() for _ in range(len(active))]
+        for hand, gesture in zip(*(index.tolist() for index in np.nonzero(active))):
+            result[hand].add(self.names[gesture])
+        return result
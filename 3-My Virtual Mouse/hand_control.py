@@ -0,0 +1,323 @@
+import itertools
+
+import numpy as np
+
+from cursor_filters import PointFilter
+from gestures import GestureEngine, landmarks_array
+from trail import Trail
+
+# Gesture cooldown in seconds
+CLICK_COOLDOWN = 1.0
+RIGHT_CLICK_COOLDOWN = 1.0
+
+# Landmarks whose mean is the palm centre, used to follow hands between frames
+PALM = [0, 5, 9, 13, 17]
+
+# Results in a row a followed hand must get the other left/right label
+# before it is taken for a different hand
+LABEL_FRAMES = 5
+
+HAND_KEYS = ("single", "handedness", "track")
+
+
+def default_hand_key(max_hands):
+    """One state for a single hand, whatever MediaPipe calls it; labels for several"""
+    return "single" if max_hands == 1 else "handedness"
+
+
+class ActionSink:
+    """Receives the actions of one hand. The base class ignores them all"""
+
+    def move(self, x, y, timestamp):
+        pass
+
+    def press(self):
+        pass
+
+    def release(self):
+        pass
+
+    def right_click(self):
+        pass
+
+    def scroll(self, clicks):
+        pass
+
+    def lost(self):
+        """The hand left the view"""
+        pass
+
+
+class MouseSink(ActionSink):
+    """Drives the system mouse through an input backend or InputQueue.
+
+    Moves go to a CursorPredictor when one is given, whose cursor thread
+    moves the pointer at a steady rate, and straight to the output otherwise.
+    """
+
+    def __init__(self, output, predictor=None):
+        self.output = output
+        self.predictor = predictor
+
+    def move(self, x, y, timestamp):
+        if self.predictor is not None:
+            self.predictor.update((x, y), timestamp)
+        else:
+            self.output.move(x, y)
+
+    def press(self):
+        self.output.press()
+
+    def release(self):
+        self.output.release()
+
+    def right_click(self):
+        self.output.right_click()
+
+    def scroll(self, clicks):
+        self.output.scroll(clicks)
+
+    def lost(self):
+        if self.predictor is not None:
+            self.predictor.reset()
+
+
+class LogSink(ActionSink):
+    """Prints the clicks, drags and scrolls of a hand, prefixed with its key"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def press(self):
+        print(f"{self.name}: press")
+
+    def release(self):
+        print(f"{self.name}: release")
+
+    def right_click(self):
+        print(f"{self.name}: right click")
+
+    def scroll(self, clicks):
+        print(f"{self.name}: scroll {clicks}")
+
+
+class HandState:
+    """Everything the virtual mouse remembers about one hand"""
+
+    def __init__(self, key, sink, cursor_filter, trail, click_cooldown=CLICK_COOLDOWN,
+                 right_click_cooldown=RIGHT_CLICK_COOLDOWN):
+        self.key = key
+        self.sink = sink
+        self.cursor_filter = cursor_filter
+        self.trail = trail
+        self.click_cooldown = click_cooldown
+        self.right_click_cooldown = right_click_cooldown
+        self.gestures = set()
+        self.dragging = False
+        self.last_click_time = -np.inf
+        self.last_right_click_time = -np.inf
+        self.gesture_text = ""
+        self.palm = None
+        self.missed = 0
+        # MediaPipe's left/right label the hand was first seen with, and for
+        # how many results in a row it has been given the other one
+        self.label = None
+        self.label_changes = 0
+
+    def update(self, points, gestures, timestamp, frame_size, screen_size):
+        """Turn the landmarks and gestures of one result into cursor moves and clicks"""
+        frame_width, frame_height = frame_size
+        screen_width, screen_height = screen_size
+        self.gesture_text = ""
+        self.gestures = gestures
+        self.missed = 0
+        self.palm = points[PALM, :2].sum(axis=0) / len(PALM)
+
+        # Smooth cursor position
+        smoothed_x, smoothed_y = self.cursor_filter(points[8, :2], timestamp)
+        self.sink.move(screen_width / frame_width * smoothed_x, screen_height / frame_height * smoothed_y, timestamp)
+        self.trail.append((int(smoothed_x), int(smoothed_y)))
+
+        # Drag & Drop
+        if "drag" in gestures:
+            if not self.dragging and timestamp - self.last_click_time > self.click_cooldown:
+                self.sink.press()
+                self.dragging = True
+                self.last_click_time = timestamp
+            self.gesture_text = "Dragging"
+        elif self.dragging:
+            self.sink.release()
+            self.dragging = False
+
+        # Right Click
+        if "right_click" in gestures:
+            if timestamp - self.last_right_click_time > self.right_click_cooldown:
+                self.sink.right_click()
+                self.gesture_text = "Right Click"
+                self.last_right_click_time = timestamp
+
+        # Scroll
+        if "scroll" in gestures:
+            self.gesture_text = "Scrolling"
+            if len(self.trail) > 1:
+                dy = int(self.trail.points[-1, 1] - self.trail.points[-2, 1])
+                if abs(dy) > 2:
+                    self.sink.scroll(-dy)
+
+    def lost(self):
+        """The hand left the view: let go of a drag and forget its motion"""
+        if self.dragging:
+            self.sink.release()
+            self.dragging = False
+        self.cursor_filter.reset()
+        self.sink.lost()
+        self.gesture_text = ""
+        self.gestures = set()
+
+
+class HandController:
+    """Keeps one HandState per hand and feeds every hand of a result through its own state.
+
+    Hands are followed by their palm positions from result to result. With
+    key_by="handedness" a new hand is keyed by MediaPipe's label ("Left"/
+    "Right") and keeps that key while it is followed, so a label that flips
+    for a frame during a pinch changes nothing; only `label_frames` results
+    in a row with the other label make it a new hand. key_by="track" numbers
+    the hands instead, which also works for two users' right hands, and
+    key_by="single" keys hands by their position in the result, one state
+    for a lone hand. All hands of a result are converted and classified as
+    one batch. `sink_for(key)` returns the ActionSink of a newly seen hand;
+    a hand that stays missing for `max_missed` results is released and
+    forgotten.
+    """
+
+    def __init__(self, sink_for, engine=None, key_by="single", filter_kind="one-euro", filter_settings=None,
+                 trail_length=50, trail_fade=False, max_missed=5, click_cooldown=CLICK_COOLDOWN,
+                 right_click_cooldown=RIGHT_CLICK_COOLDOWN, label_frames=LABEL_FRAMES):
+        if key_by not in HAND_KEYS:
+            raise ValueError(f"Unknown hand key: {key_by}")
+        self.sink_for = sink_for
+        self.engine = engine or GestureEngine()
+        self.key_by = key_by
+        self.filter_kind = filter_kind
+        self.filter_settings = filter_settings or {}
+        self.trail_length = trail_length
+        self.trail_fade = trail_fade
+        self.max_missed = max_missed
+        self.click_cooldown = click_cooldown
+        self.right_click_cooldown = right_click_cooldown
+        self.label_frames = label_frames
+        self.states = {}
+
+    def _new_state(self, key):
+        return HandState(key, self.sink_for(key), PointFilter(self.filter_kind, **self.filter_settings),
+                         Trail(self.trail_length, fade=self.trail_fade), self.click_cooldown,
+                         self.right_click_cooldown)
+
+    def _label_key(self, label, taken):
+        # A hand that is not followed takes back the state of its label if no hand is in it
+        for key, state in self.states.items():
+            if state.label == label and key not in taken:
+                return key
+        # Two users can both show a right hand
+        return next(key for key in (label if i == 1 else f"{label}{i}" for i in itertools.count(1))
+                    if key not in self.states and key not in taken)
+
+    def _track_keys(self, points, labels=None):
+        # Greedy nearest match of the palms to the known hands, the closest pairs first
+        palms = points[:, PALM, :2].mean(axis=1)
+        known = [key for key, state in self.states.items() if state.palm is not None]
+        keys = [None] * len(palms)
+        if known:
+            sizes = np.linalg.norm(points[:, 0, :2] - points[:, 9, :2], axis=1)
+            previous = np.array([self.states[key].palm for key in known])
+            distance = np.linalg.norm(palms[:, None, :] - previous[None, :, :], axis=2)
+            # Farther than two hand sizes is a different hand
+            distance[distance > 2 * sizes[:, None]] = np.inf
+            for flat in np.argsort(distance, axis=None):
+                hand, other = np.unravel_index(flat, distance.shape)
+                if not np.isfinite(distance[hand, other]):
+                    break
+                if keys[hand] is None and known[other] not in keys:
+                    keys[hand] = known[other]
+        for hand in range(len(keys)):
+            if keys[hand] is not None:
+                continue
+            if labels:
+                keys[hand] = self._label_key(labels[hand], keys)
+            else:
+                # The smallest number not in use, so hand 0 comes back as 0
+                keys[hand] = next(str(i) for i in range(len(self.states) + len(keys) + 1)
+                                  if str(i) not in self.states and str(i) not in keys)
+        return keys
+
+    def _check_labels(self, keys, labels):
+        # A followed hand keeps its key through label flips; only a label that
+        # stays different makes it a new hand, with the sink of that label
+        for hand, key in enumerate(keys):
+            state = self.states.get(key)
+            if state is None or state.label == labels[hand]:
+                if state is not None:
+                    state.label_changes = 0
+                continue
+            state.label_changes += 1
+            if state.label_changes >= self.label_frames:
+                state.lost()
+                del self.states[key]
+                keys[hand] = self._label_key(labels[hand], keys)
+
+    def update(self, hands, handedness, timestamp, frame_size, screen_size):
+        """Process every hand of one MediaPipe result, returns the states of the hands in view"""
+        points = np.stack([landmarks_array(hand, *frame_size) for hand in hands]) if hands else None
+        labels = [entry.classification[0].label for entry in handedness] if hands and handedness else None
+        return self.update_arrays(points, labels, timestamp, frame_size, screen_size)
+
+    def update_arrays(self, points, labels, timestamp, frame_size, screen_size, gestures=None):
+        """Same as update() for an (H, 21, 3) array of pixel landmarks and their "Left"/"Right" labels.
+
+        `gestures` can pass in the gesture sets of the hands when they were
+        already classified, e.g. a whole recording at once.
+        """
+        seen = []
+        if points is not None and len(points):
+            if gestures is None:
+                gestures = self.engine.batch(points)
+            if self.key_by == "single":
+                keys = [str(i) for i in range(len(points))]
+            elif self.key_by == "handedness" and labels:
+                keys = self._track_keys(points, labels)
+                self._check_labels(keys, labels)
+            else:
+                keys = self._track_keys(points)
+            for index, key in enumerate(keys):
+                state = self.states.get(key)
+                if state is None:
+                    state = self.states[key] = self._new_state(key)
+                    state.label = labels[index] if labels else None
+                state.update(points[index], gestures[index], timestamp, frame_size, screen_size)
+                seen.append(state)
+
+        for key in [key for key, state in self.states.items() if state not in seen]:
+            state = self.states[key]
+            state.missed += 1
+            if state.missed == 1:
+                state.lost()
+            if state.missed > self.max_missed:
+                del self.states[key]
+        return seen
+
+    def release_all(self):
+        for state in self.states.values():
+            state.lost()
+        self.states.clear()
+
+
+def parse_sinks(text):
+    """Parse "Right=mouse,Left=log,*=none" into a {hand key: sink name} dict"""
+    sinks = {}
+    for item in filter(None, (text or "").split(",")):
+        key, _, name = item.partition("=")
+        if not key or name not in ("mouse", "log", "none"):
+            raise ValueError(f"Bad hand sink: {item}")
+        sinks[key.strip()] = name
+    return sinks
@@ -0,0 +1,274 @@
+import threading
+import time
+
+import cv2
+
+
+class HandResult:
+    """Landmarks of one processed frame, with the time that frame was captured"""
+
+    def __init__(self, hands=None, handedness=None, timestamp=0.0, sequence=0):
+        self.hands = hands
+        self.handedness = handedness
+        self.timestamp = timestamp
+        self.sequence = sequence
+
+
+class RoiHandDetector:
+    """Runs a hand detector on a crop around the hand instead of the whole frame.
+
+    Wraps anything with a process(rgb_frame) method, like mediapipe's Hands,
+    and has the same interface. Once a hand is found, the next frames are
+    cropped to a square around its landmarks (grown by `margin` on every
+    side) and scaled down to at most `crop_size` pixels. The crop stays put
+    while the hand stays well inside it, so the detector's own tracking sees
+    a steady image, and moves with the hand otherwise. When the crop loses
+    the hand, the full frame, scaled down to `full_width`, is searched
+    again. With several hands, `full_every` also searches the full frame
+    every so many frames, so hands entering the view outside the crop are
+    found. Landmarks are always returned in full frame coordinates.
+    """
+
+    def __init__(self, detector, margin=0.35, crop_size=256, min_crop=96, full_width=640, full_every=None):
+        self.detector = detector
+        self.margin = margin
+        self.crop_size = crop_size
+        self.min_crop = min_crop
+        self.full_width = full_width
+        self.full_every = full_every
+        self.crop = None
+        self.frames = 0
+        self.crops = 0
+        self.full_frames = 0
+        self.lost = 0
+
+    def process(self, rgb_frame):
+        height, width = rgb_frame.shape[:2]
+        self.frames += 1
+        if self.full_every and self.frames % self.full_every == 0:
+            self.crop = None
+        if self.crop is not None:
+            x0, y0, x1, y1 = self.crop
+            output = self.detector.process(self._shrink(rgb_frame[y0:y1, x0:x1], self.crop_size, True))
+            self.crops += 1
+            if output.multi_hand_landmarks:
+                self._to_frame(output.multi_hand_landmarks, (x0, y0, x1, y1), width, height)
+                self._follow(output.multi_hand_landmarks, width, height)
+                return output
+            self.lost += 1
+            self.crop = None
+
+        output = self.detector.process(self._shrink(rgb_frame, self.full_width, False))
+        self.full_frames += 1
+        if output.multi_hand_landmarks:
+            self._follow(output.multi_hand_landmarks, width, height)
+        return output
+
+    @staticmethod
+    def _shrink(image, size, longest_side):
+        height, width = image.shape[:2]
+        scale = size / (max(height, width) if longest_side else width)
+        if scale >= 1:
+            return image
+        return cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def _to_frame(hands, crop, width, height):
+        # Normalized crop coordinates to normalized frame coordinates; z has the scale of x
+        x0, y0, x1, y1 = crop
+        sx, sy = (x1 - x0) / width, (y1 - y0) / height
+        for hand in hands:
+            for lm in hand.landmark:
+                lm.x = x0 / width + lm.x * sx
+                lm.y = y0 / height + lm.y * sy
+                lm.z = lm.z * sx
+
+    def _follow(self, hands, width, height):
+        xs = [lm.x * width for hand in hands for lm in hand.landmark]
+        ys = [lm.y * height for hand in hands for lm in hand.landmark]
+        bx0, bx1, by0, by1 = min(xs), max(xs), min(ys), max(ys)
+        if self.crop is not None:
+            # Keep the crop while the hand is at least half a margin away from its edges
+            x0, y0, x1, y1 = self.crop
+            keep = self.margin / 2 * max(bx1 - bx0, by1 - by0)
+            if bx0 - x0 >= keep and x1 - bx1 >= keep and by0 - y0 >= keep and y1 - by1 >= keep:
+                return
+        side = max(bx1 - bx0, by1 - by0) * (1 + 2 * self.margin)
+        side = min(max(side, self.min_crop), width, height)
+        cx, cy = (bx0 + bx1) / 2, (by0 + by1) / 2
+        x0 = int(min(max(cx - side / 2, 0), width - side))
+        y0 = int(min(max(cy - side / 2, 0), height - side))
+        self.crop = (x0, y0, x0 + int(side), y0 + int(side))
+
+    def reset(self):
+        self.crop = None
+
+    def stats(self):
+        return {"crops": self.crops, "full_frames": self.full_frames, "lost": self.lost}
+
+
+class AsyncHandTracker:
+    """Runs hand landmark inference on a worker thread.
+
+    submit() hands the worker the newest frame and returns immediately; a
+    frame still waiting when the next one arrives is replaced, so the worker
+    always starts on the freshest frame and never builds a backlog. latest()
+    returns the last published result, whose `sequence` goes up by one for
+    every processed frame. The detector only needs a process(rgb_frame)
+    method, like mediapipe's Hands. If it raises, the worker stops and the
+    exception is kept in `error` for the caller to check, since the latest
+    result would otherwise go stale without a sign.
+    """
+
+    def __init__(self, detector, profiler=None):
+        self.detector = detector
+        self.profiler = profiler
+        self.condition = threading.Condition()
+        self.pending = None
+        self.result = HandResult()
+        self.submitted = 0
+        self.replaced = 0
+        self.error = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="hand-tracker", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def submit(self, rgb_frame, timestamp=None):
+        """Queue a frame for inference, replacing the one still waiting if any"""
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        with self.condition:
+            if self.pending is not None:
+                self.replaced += 1
+            self.pending = (rgb_frame, timestamp)
+            self.submitted += 1
+            self.condition.notify()
+
+    def latest(self):
+        return self.result
+
+    def _run(self):
+        sequence = 0
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stop_event.is_set():
+                    self.condition.wait()
+                if self.stop_event.is_set():
+                    return
+                rgb_frame, timestamp = self.pending
+                self.pending = None
+
+            start = time.perf_counter()
+            try:
+                output = self.detector.process(rgb_frame)
+            except Exception as error:
+                self.error = error
+                return
+            if self.profiler is not None:
+                self.profiler.record("inference", time.perf_counter() - start)
+            sequence += 1
+            # A single assignment, so readers see either the old or the new result
+            self.result = HandResult(output.multi_hand_landmarks, getattr(output, "multi_handedness", None),
+                                     timestamp, sequence)
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify()
+        self.thread.join()
+
+
+class CursorPredictor:
+    """Estimates the cursor position between landmark results.
+
+    update() is called with every new position and the capture time of its
+    frame. position(now) then either extrapolates along the last velocity
+    ("predict", which also makes up for the inference delay) for at most
+    `max_ahead` seconds, or moves from the previous position to the latest
+    one over one result interval ("interpolate", smoother but one interval
+    behind).
+    """
+
+    def __init__(self, mode="predict", max_ahead=0.1):
+        if mode not in ("predict", "interpolate"):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.mode = mode
+        self.max_ahead = max_ahead
+        self.lock = threading.Lock()
+        self.previous = None
+        self.current = None
+
+    def update(self, point, timestamp):
+        with self.lock:
+            self.previous = self.current
+            self.current = (float(point[0]), float(point[1]), timestamp)
+
+    def reset(self):
+        with self.lock:
+            self.previous = self.current = None
+
+    def position(self, now=None):
+        """Return the (x, y) estimate at time `now`, or None before the first update"""
+        now = time.perf_counter() if now is None else now
+        with self.lock:
+            previous, current = self.previous, self.current
+        if current is None:
+            return None
+        x, y, t = current
+        if previous is None or t <= previous[2]:
+            return x, y
+        px, py, pt = previous
+        interval = t - pt
+        if self.mode == "predict":
+            ahead = min(max(now - t, 0.0), self.max_ahead)
+            return x + (x - px) * ahead / interval, y + (y - py) * ahead / interval
+        # Interpolation starts at the previous point when the latest result arrives
+        progress = min(max(now - t, 0.0) / interval, 1.0)
+        return px + (x - px) * progress, py + (y - py) * progress
+
+
+class CursorMover:
+    """Moves the cursor at a fixed rate from a position callback, on its own thread.
+
+    `position` returns the (x, y) to move to or None, `move` does the actual
+    move. Positions that did not change by at least a pixel are not sent
+    again, so a still hand costs no cursor calls.
+    """
+
+    def __init__(self, position, move, rate=60.0):
+        self.position = position
+        self.move = move
+        self.interval = 1.0 / rate
+        self.moves = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="cursor", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        last = None
+        next_time = time.perf_counter()
+        while not self.stop_event.is_set():
+            point = self.position()
+            if point is not None:
+                point = (int(round(point[0])), int(round(point[1])))
+                if point != last:
+                    self.move(*point)
+                    self.moves += 1
+                    last = point
+            next_time += self.interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            else:
+                # Fell behind, start counting again from now rather than bursting
+                next_time = time.perf_counter()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
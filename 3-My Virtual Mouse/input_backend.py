@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import Counter, deque
+
+from common.timing import LatencyHistogram
+
+BACKENDS = ("pyautogui", "record", "none")
+
+
+class NullBackend:
+    """Accepts every input event and does nothing, for benchmarks"""
+
+    def __init__(self, screen_size=(1920, 1080)):
+        self.screen_size = screen_size
+
+    def size(self):
+        return self.screen_size
+
+    def move(self, x, y):
+        pass
+
+    def press(self):
+        pass
+
+    def release(self):
+        pass
+
+    def right_click(self):
+        pass
+
+    def scroll(self, clicks):
+        pass
+
+
+class RecordingBackend(NullBackend):
+    """Keeps every input event as (time, name, args), for tests and replays"""
+
+    def __init__(self, screen_size=(1920, 1080)):
+        super().__init__(screen_size)
+        self.events = []
+        self.counts = Counter()
+
+    def _record(self, name, *args):
+        self.events.append((time.perf_counter(), name, args))
+        self.counts[name] += 1
+
+    def move(self, x, y):
+        self._record("move", x, y)
+
+    def press(self):
+        self._record("press")
+
+    def release(self):
+        self._record("release")
+
+    def right_click(self):
+        self._record("right_click")
+
+    def scroll(self, clicks):
+        self._record("scroll", clicks)
+
+
+class PyAutoGuiBackend:
+    """Sends the events to the operating system through pyautogui"""
+
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def size(self):
+        return tuple(self.pyautogui.size())
+
+    # _pause=False: pyautogui otherwise sleeps 0.1 s after every call
+    def move(self, x, y):
+        self.pyautogui.moveTo(x, y, _pause=False)
+
+    def press(self):
+        self.pyautogui.mouseDown(_pause=False)
+
+    def release(self):
+        self.pyautogui.mouseUp(_pause=False)
+
+    def right_click(self):
+        self.pyautogui.rightClick(_pause=False)
+
+    def scroll(self, clicks):
+        self.pyautogui.scroll(clicks, _pause=False)
+
+
+def create_backend(name, screen_size=(1920, 1080)):
+    if name == "pyautogui":
+        return PyAutoGuiBackend()
+    if name == "record":
+        return RecordingBackend(screen_size)
+    if name == "none":
+        return NullBackend(screen_size)
+    raise ValueError(f"Unknown input backend: {name}")
+
+
+class InputQueue:
+    """Hands input events to a backend on a dedicated thread.
+
+    Calls return at once, so neither the vision loop nor the cursor thread
+    ever waits for the operating system. Consecutive moves are coalesced to
+    the latest position while they wait; clicks and scrolls keep their
+    order relative to the moves around them. Has the same methods as the
+    backends, so it can stand in for one.
+
+    An event whose backend call raises (e.g. pyautogui's fail-safe in a
+    screen corner) is dropped and counted; the first error is kept in
+    `error` for the caller to check, and the thread goes on with the rest.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.condition = threading.Condition()
+        self.events = deque()
+        self.stopping = False
+        self.queued = 0
+        self.coalesced = 0
+        self.executed = 0
+        self.failed = 0
+        self.error = None
+        self.latency = LatencyHistogram()
+        self.thread = threading.Thread(target=self._run, name="input", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def size(self):
+        return self.backend.size()
+
+    def _put(self, name, args=()):
+        with self.condition:
+            self.queued += 1
+            if name == "move" and self.events and self.events[-1][0] == "move":
+                # Only the latest position of a run of moves matters, it keeps the time of the first
+                self.events[-1] = ("move", args, self.events[-1][2])
+                self.coalesced += 1
+            else:
+                self.events.append((name, args, time.perf_counter()))
+            self.condition.notify()
+
+    def move(self, x, y):
+        self._put("move", (x, y))
+
+    def press(self):
+        self._put("press")
+
+    def release(self):
+        self._put("release")
+
+    def right_click(self):
+        self._put("right_click")
+
+    def scroll(self, clicks):
+        self._put("scroll", (clicks,))
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.events and not self.stopping:
+                    self.condition.wait()
+                if not self.events:
+                    return
+                name, args, queued_time = self.events.popleft()
+            try:
+                getattr(self.backend, name)(*args)
+            except Exception as error:
+                self.failed += 1
+                if self.error is None:
+                    self.error = error
+                continue
+            self.executed += 1
+            self.latency.record(time.perf_counter() - queued_time)
+
+    def stop(self):
+        """Send the events still waiting, then stop the thread"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.thread.join()
+
+    def stats(self):
+        return {
+            "queued": self.queued,
+            "coalesced": self.coalesced,
+            "executed": self.executed,
+            "failed": self.failed,
+            "latency_p50_ms": round(1000 * self.latency.percentile(0.50), 2),
+            "latency_p99_ms": round(1000 * self.latency.percentile(0.99), 2),
+        }
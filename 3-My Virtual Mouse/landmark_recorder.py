@@ -0,0 +1,93 @@
+import os
+import struct
+
+import numpy as np
+
+HANDEDNESS = {"Left": 0, "Right": 1}
+LABELS = {value: key for key, value in HANDEDNESS.items()}
+
+# Room in the header for the final row count, written when the recording is closed
+_COUNT_DIGITS = 12
+
+
+def record_dtype(max_hands):
+    """One row per hand tracking result; hands beyond `count` are zeros and handedness -1"""
+    return np.dtype([
+        ("timestamp", "<f8"),
+        ("width", "<u2"),
+        ("height", "<u2"),
+        ("count", "u1"),
+        ("handedness", "i1", (max_hands,)),
+        ("landmarks", "<f4", (max_hands, 21, 3)),
+    ])
+
+
+def _npy_header(dtype, rows, size=None):
+    text = "{'descr': %r, 'fortran_order': False, 'shape': (%s,), }" % (
+        np.lib.format.dtype_to_descr(dtype), str(rows).rjust(_COUNT_DIGITS))
+    if size is None:
+        # Magic, version, header length, text and newline, padded so the data is 64 byte aligned
+        size = -(-(10 + len(text) + 1) // 64) * 64
+    text = text.ljust(size - 10 - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(text)) + text.encode("latin1")
+
+
+class LandmarkRecorder:
+    """Streams hand tracking results into a .npy file of one structured row per result.
+
+    Landmarks are stored as MediaPipe gives them (normalized x, y, z) for up
+    to `max_hands` hands, with the frame size and the capture timestamp.
+    Rows are appended as they come, and the row count in the header is
+    filled in by close(); load_recording() reads files that were never
+    closed too. The file opens with np.load(path, mmap_mode="r").
+    """
+
+    def __init__(self, path, max_hands=1):
+        self.path = path
+        self.dtype = record_dtype(max_hands)
+        self.max_hands = max_hands
+        self.row = np.zeros((), dtype=self.dtype)
+        self.rows = 0
+        self.file = open(path, "wb")
+        self.header_size = len(_npy_header(self.dtype, 0))
+        self.file.write(_npy_header(self.dtype, 0))
+
+    def write(self, timestamp, hands, handedness, frame_size):
+        row = self.row
+        row["timestamp"] = timestamp
+        row["width"], row["height"] = frame_size
+        hands = (hands or [])[:self.max_hands]
+        row["count"] = len(hands)
+        row["handedness"] = -1
+        row["landmarks"] = 0
+        for i, hand in enumerate(hands):
+            row["landmarks"][i] = [(lm.x, lm.y, lm.z) for lm in hand.landmark]
+            if handedness:
+                row["handedness"][i] = HANDEDNESS.get(handedness[i].classification[0].label, -1)
+        self.file.write(row.tobytes())
+        self.rows += 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.seek(0)
+        self.file.write(_npy_header(self.dtype, self.rows, self.header_size))
+        self.file.close()
+
+
+def load_recording(path):
+    """Memory-map a recording as a structured array, also if it was never closed"""
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    rows = (os.path.getsize(path) - offset) // dtype.itemsize
+    if shape[0]:
+        rows = min(rows, shape[0])
+    if rows == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(rows,))
+
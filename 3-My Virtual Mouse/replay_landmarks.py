@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+# The shared helpers live in common/ at the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cursor_filters import AXIS_FILTERS, parse_settings
+from gestures import GESTURE_RULES, GestureEngine, with_thresholds
+from hand_control import (CLICK_COOLDOWN, HAND_KEYS, RIGHT_CLICK_COOLDOWN, HandController, MouseSink,
+                          default_hand_key)
+from input_backend import RecordingBackend
+from landmark_recorder import LABELS, load_recording
+
+
+def pixel_landmarks(recording):
+    """Landmarks of the whole recording in pixels, (rows, max_hands, 21, 3)"""
+    sizes = np.stack([recording["width"], recording["height"], recording["width"]], axis=1).astype(np.float32)
+    return np.asarray(recording["landmarks"]) * sizes[:, None, None, :]
+
+
+def classify_all(points, counts, engine):
+    """Gesture sets of every hand of every row, from one batch over the whole recording"""
+    # Only the hands in view, as one (hands, 21, 3) batch
+    in_view = np.arange(points.shape[1])[None, :] < counts[:, None]
+    flat = engine.batch(points[in_view]) if in_view.any() else []
+    ends = np.cumsum(counts).tolist()
+    return [flat[end - count:end] for count, end in zip(counts.tolist(), ends)]
+
+
+def replay(recording, engine, screen_size, key_by="single", filter_kind="one-euro", filter_settings=None,
+           click_cooldown=CLICK_COOLDOWN, right_click_cooldown=RIGHT_CLICK_COOLDOWN):
+    """Feed a recording through the gesture and cursor logic, returns a report of what it did.
+
+    Gestures of the whole recording are classified in one batch, but every
+    result still goes through HandController.update_arrays() one at a
+    time, since the cursor filter and trail decide the scroll events.
+    """
+    backends = {}
+
+    def sink_for(key):
+        backends.setdefault(key, RecordingBackend(screen_size))
+        return MouseSink(backends[key])
+
+    controller = HandController(sink_for, engine, key_by, filter_kind, filter_settings,
+                                click_cooldown=click_cooldown, right_click_cooldown=right_click_cooldown)
+    frames, onsets = Counter(), Counter()
+    previous = {}
+
+    start = time.perf_counter()
+    counts = np.asarray(recording["count"]).astype(int)
+    points = pixel_landmarks(recording)
+    all_gestures = classify_all(points, counts, engine)
+    timestamps = recording["timestamp"].tolist()
+    widths, heights = recording["width"].tolist(), recording["height"].tolist()
+    handedness = recording["handedness"].tolist()
+    for row, count in enumerate(counts.tolist()):
+        labels = None
+        if count:
+            codes = handedness[row][:count]
+            labels = [LABELS[code] for code in codes] if min(codes) >= 0 else None
+        visible = controller.update_arrays(points[row, :count] if count else None, labels, timestamps[row],
+                                           (widths[row], heights[row]), screen_size, all_gestures[row])
+        current = {}
+        for state in visible:
+            current[state.key] = state.gestures
+            frames.update(state.gestures)
+            onsets.update(state.gestures - previous.get(state.key, set()))
+        previous = current
+    controller.release_all()
+    elapsed = time.perf_counter() - start
+
+    recorded = timestamps[-1] - timestamps[0] if len(timestamps) > 1 else 0.0
+    events = Counter()
+    for backend in backends.values():
+        events.update(backend.counts)
+    return {
+        "results": len(counts),
+        "hands": int(counts.sum()),
+        "recorded_seconds": round(recorded, 3),
+        "replay_seconds": round(elapsed, 4),
+        "speedup": round(recorded / elapsed, 1) if elapsed else None,
+        "us_per_result": round(1e6 * elapsed / max(len(counts), 1), 1),
+        "gesture_frames": dict(sorted(frames.items())),
+        "gesture_onsets": dict(sorted(onsets.items())),
+        "events": dict(sorted(events.items())),
+        "events_by_hand": {key: dict(sorted(backend.counts.items())) for key, backend in sorted(backends.items())},
+    }
+
+
+def flip_labels(recording, every):
+    """A copy of the recording with the handedness of every `every`-th result with hands swapped for that one result"""
+    flipped = np.array(recording)
+    rows = np.flatnonzero(flipped["count"] > 0)[every // 2::every]
+    labels = flipped["handedness"][rows]
+    flipped["handedness"][rows] = np.where(labels >= 0, 1 - labels, labels)
+    return flipped
+
+
+def parse_thresholds(text):
+    """Parse "drag=0.4,scroll=0.3" into {gesture: threshold}"""
+    thresholds = {}
+    for item in filter(None, (text or "").split(",")):
+        name, _, value = item.partition("=")
+        thresholds[name.strip()] = float(value)
+    return thresholds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded hand landmarks through the gesture logic")
+    parser.add_argument("recording", help=".npy file written by the virtual mouse with --record")
+    parser.add_argument("--repeat", type=int, default=1, help="replay this many times, for timing")
+    parser.add_argument("--thresholds", help='gesture thresholds in hand sizes, e.g. "drag=0.4,scroll=0.3"')
+    parser.add_argument("--click-cooldown", type=float, default=CLICK_COOLDOWN, help="seconds between presses")
+    parser.add_argument("--right-click-cooldown", type=float, default=RIGHT_CLICK_COOLDOWN,
+                        help="seconds between right clicks")
+    parser.add_argument("--hand-key", choices=HAND_KEYS, help="default: as the virtual mouse, from the recorded hands")
+    parser.add_argument("--cursor-filter", choices=sorted(AXIS_FILTERS), default="one-euro")
+    parser.add_argument("--filter-settings", default="")
+    parser.add_argument("--screen-size", default="1920x1080")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--expect", help="compare the gesture and event counts with this report, exit 1 if they differ")
+    parser.add_argument("--flip-every", type=int,
+                        help="also replay with the left/right label of every N-th result flipped, exit 1 if the "
+                             "gestures or events change")
+    args = parser.parse_args()
+
+    recording = load_recording(args.recording)
+    if len(recording) == 0:
+        parser.error("the recording is empty")
+    engine = GestureEngine(with_thresholds(GESTURE_RULES, parse_thresholds(args.thresholds)))
+    screen_size = tuple(int(v) for v in args.screen_size.split("x"))
+    hand_key = args.hand_key or default_hand_key(recording["handedness"].shape[1])
+    settings = (args.cursor_filter, parse_settings(args.filter_settings), args.click_cooldown,
+                args.right_click_cooldown)
+
+    for _ in range(args.repeat):
+        report = replay(recording, engine, screen_size, hand_key, *settings)
+        print(f"{report['results']} results ({report['recorded_seconds']:.1f}s recorded) replayed in "
+              f"{report['replay_seconds'] * 1000:.1f} ms, {report['speedup']}x real time, "
+              f"{report['us_per_result']} us per result")
+    print("gesture frames:", report["gesture_frames"])
+    print("gesture onsets:", report["gesture_onsets"])
+    print("events:", report["events"])
+
+    failed = False
+    if args.flip_every:
+        flipped = replay(flip_labels(recording, args.flip_every), engine, screen_size, hand_key, *settings)
+        keys = ("gesture_frames", "gesture_onsets", "events_by_hand")
+        differences = [key for key in keys if flipped[key] != report[key]]
+        for key in differences:
+            print(f"MISMATCH with flipped labels {key}: {report[key]} became {flipped[key]}")
+        if not differences:
+            print(f"unchanged with the label of every {args.flip_every}th result flipped")
+        failed = bool(differences)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.expect:
+        with open(args.expect) as f:
+            expected = json.load(f)
+        keys = ("gesture_frames", "gesture_onsets", "events_by_hand")
+        differences = [key for key in keys if expected.get(key) != report[key]]
+        for key in differences:
+            print(f"MISMATCH {key}: expected {expected.get(key)}, got {report[key]}")
+        if not differences:
+            print("matches", args.expect)
+        failed = failed or bool(differences)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
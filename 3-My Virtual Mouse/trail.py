@@ -0,0 +1,78 @@
+import cv2
+import numpy as np
+
+
+class Trail:
+    """The last `capacity` cursor points, drawn as one polyline.
+
+    Points live in a NumPy ring buffer that is written twice, at i and at
+    i + capacity, so the points from oldest to newest are always a
+    contiguous slice and neither appending nor drawing copies the history.
+
+    With fade=True the older part of the trail is blended into the frame
+    with decreasing opacity, in `fade_steps` bands each blended over its own
+    bounding box only.
+    """
+
+    def __init__(self, capacity=50, color=(0, 0, 255), thickness=2, fade=False, fade_steps=4):
+        if capacity < 2:
+            raise ValueError("A trail needs room for at least 2 points")
+        self.capacity = capacity
+        self.color = color
+        self.thickness = thickness
+        self.fade = fade
+        self.fade_steps = fade_steps
+        self.buffer = np.zeros((2 * capacity, 2), dtype=np.int32)
+        self.head = 0
+        self.count = 0
+
+    def append(self, point):
+        tail = (self.head + self.count) % self.capacity
+        self.buffer[tail] = point
+        self.buffer[tail + self.capacity] = point
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.head = (self.head + 1) % self.capacity
+
+    def clear(self):
+        self.head = self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def points(self):
+        """(N, 2) view of the points, oldest first"""
+        return self.buffer[self.head:self.head + self.count]
+
+    def draw(self, frame):
+        if self.count < 2:
+            return frame
+        if not self.fade:
+            cv2.polylines(frame, [self.points], False, self.color, self.thickness)
+            return frame
+
+        points = self.points
+        height, width = frame.shape[:2]
+        margin = self.thickness + 1
+        # Bands share their end points so the polyline has no gaps
+        bounds = np.linspace(0, self.count - 1, self.fade_steps + 1).round().astype(int)
+        for step, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            if end <= start:
+                continue
+            band = points[start:end + 1]
+            alpha = (step + 1) / self.fade_steps
+            if alpha >= 1:
+                cv2.polylines(frame, [band], False, self.color, self.thickness)
+                continue
+            # Blend over the bounding box of the band only
+            x0, y0 = np.maximum(band.min(axis=0) - margin, 0)
+            x1, y1 = np.minimum(band.max(axis=0) + margin + 1, (width, height))
+            if x1 <= x0 or y1 <= y0:
+                continue
+            roi = frame[y0:y1, x0:x1]
+            layer = roi.copy()
+            cv2.polylines(layer, [band - (x0, y0)], False, self.color, self.thickness)
+            cv2.addWeighted(layer, alpha, roi, 1 - alpha, 0, dst=roi)
+        return frame
@@ -1,21 +1,48 @@
 
+import argparse
+import os
+import sys
 import cv2
 import numpy as np
 import math
 import time
 
+# The shared helpers live in common/ at the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.timing import Profiler
+from history import TileHistory
+from palette_layout import toolbar_layout
+from palette_render import DirtyRenderer
+from saver import BackgroundSaver, ExportFormat, parse_exports
+from tiled_canvas import TiledCanvas, Viewport
+
 class InteractiveDigitalPalette:
-    def __init__(self):
-        # Window setup
+    def __init__(self, headless=False, profiler=None, canvas_size=None, spill_dir=None, export_formats=None,
+                 autosave_every=0):
+        # Window setup, skipped when headless (benchmarks and scripted use)
         self.window_name = "Interactive Digital Palette"
-        cv2.namedWindow(self.window_name)
+        self.headless = headless
+        if not headless:
+            cv2.namedWindow(self.window_name)
+
+        # Latency of drawing and rendering
+        self.profiler = profiler or Profiler("palette")
         
-        # Canvas dimensions
+        # Dimensions of the canvas area in the window
         self.width, self.height = 1024, 768
         
-        # Create canvas and interface areas
-        self.canvas = np.ones((self.height, self.width, 3), dtype=np.uint8) * 255
-        self.interface_height = 120
+        # Create canvas and interface areas. The canvas can be larger than the
+        # window: it is stored as tiles, blank ones cost nothing, and the view
+        # pans and zooms over it
+        canvas_width, canvas_height = canvas_size or (self.width, self.height)
+        self.canvas = TiledCanvas(canvas_width, canvas_height, spill_dir=spill_dir)
+        self.view = Viewport(self.canvas, self.width, self.height)
+        self.pan_from = None
+        # The toolbar is at least this tall, and grows when its controls need more rows
+        self.min_interface_height = 120
+        self.interface_height = self.min_interface_height
+        self.renderer = None
         
         # Drawing properties
         self.drawing = False
@@ -46,9 +73,10 @@ class InteractiveDigitalPalette:
         self.custom_b = 0
         
         # Create trackbars for custom color
-        cv2.createTrackbar('R', self.window_name, 0, 255, self.update_custom_color)
-        cv2.createTrackbar('G', self.window_name, 0, 255, self.update_custom_color)
-        cv2.createTrackbar('B', self.window_name, 0, 255, self.update_custom_color)
+        if not headless:
+            cv2.createTrackbar('R', self.window_name, 0, 255, self.update_custom_color)
+            cv2.createTrackbar('G', self.window_name, 0, 255, self.update_custom_color)
+            cv2.createTrackbar('B', self.window_name, 0, 255, self.update_custom_color)
         
         # Tools
         self.tools = [
@@ -71,16 +99,45 @@ class InteractiveDigitalPalette:
         ]
         self.current_effect = 0
         
-        # History for undo/redo
-        self.history = [self.canvas.copy()]
-        self.history_position = 0
+        # Where every control of the toolbar is, for drawing and for clicks
+        self.update_layout()
+        
+        # History for undo/redo, keeps only the tiles each action changed
+        self.history = TileHistory(self.canvas)
+        
+        # Saving, on a thread of its own, and auto-save every few seconds
+        self.saver = BackgroundSaver()
+        self.export_formats = export_formats or [ExportFormat("png", None, None)]
+        self.autosave_every = autosave_every
+        self.last_autosave = time.monotonic()
+        self.autosaved_version = self.canvas.version
+        self.status_text = ""
         
         # Set up mouse callback
-        cv2.setMouseCallback(self.window_name, self.mouse_callback)
+        if not headless:
+            cv2.setMouseCallback(self.window_name, self.mouse_callback)
+        
+        # Display kept between frames, only the changed parts are redrawn
+        self.renderer = DirtyRenderer(self.width, self.height, self.interface_height, self.render_toolbar)
         
         # Create initial interface
         self.draw_interface()
 
+    def update_layout(self):
+        """Lay out the toolbar again, after changing the colors, brush sizes, tools or effects"""
+        self.layout = toolbar_layout(self.width, self.min_interface_height, self.colors, self.brush_sizes,
+                                     self.tools, self.effects)
+        if self.layout.height != self.interface_height:
+            self.interface_height = self.layout.height
+            if self.renderer is not None:
+                self.renderer = DirtyRenderer(self.width, self.height, self.interface_height, self.render_toolbar)
+
+    def add_color(self, name, color):
+        """Add a color to the palette"""
+        self.colors.append({"name": name, "color": color})
+        self.update_layout()
+        self.draw_interface()
+
     def update_custom_color(self, value=None):
         """Update custom color from trackbars"""
         self.custom_r = cv2.getTrackbarPos('R', self.window_name)
@@ -103,59 +160,57 @@ class InteractiveDigitalPalette:
 
     def clear_canvas(self):
         """Clear the canvas"""
-        # Create a white canvas
-        self.canvas = np.ones((self.height, self.width, 3), dtype=np.uint8) * 255
+        # Drop every tile, blank tiles are white
+        self.canvas.clear()
         
         # Add to history
         self.add_to_history()
         
         # Redraw interface
+        self.renderer.invalidate()
         self.draw_interface()
 
     def save_image(self):
-        """Save the current canvas as an image"""
+        """Save the current canvas in every export format"""
         timestamp = time.strftime("%Y%m%d_%H%M%S")
-        filename = f"artwork_{timestamp}.png"
-        cv2.imwrite(filename, self.canvas)
-        
-        # Show save confirmation
-        temp_display = self.canvas.copy()
-        cv2.putText(temp_display, f"Saved as {filename}", 
-                    (self.width//2 - 200, self.height//2), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
-        cv2.imshow(self.window_name, temp_display)
-        cv2.waitKey(1000)  # Show confirmation for 1 second
         
-        # Redraw interface
-        self.draw_interface()
+        # Written on the saver thread from a snapshot, drawing goes on meanwhile
+        self.saver.save(self.canvas.snapshot(), f"artwork_{timestamp}", self.export_formats)
+        self.update_status()
+
+    def autosave(self):
+        """Save the canvas to autosave.png every autosave_every seconds, if it changed"""
+        now = time.monotonic()
+        if not self.autosave_every or now - self.last_autosave < self.autosave_every:
+            return
+        self.last_autosave = now
+        if self.canvas.version != self.autosaved_version and not self.saver.busy():
+            self.autosaved_version = self.canvas.version
+            self.saver.save(self.canvas.snapshot(), "autosave", [ExportFormat("png", 1, None)], "Auto-saving")
+
+    def update_status(self):
+        """Show the progress of saves in the toolbar"""
+        text = self.saver.status()
+        if text != self.status_text:
+            self.status_text = text
+            self.draw_interface()
 
     def add_to_history(self):
-        """Add current canvas state to history"""
-        # If we're not at the end of history, truncate
-        if self.history_position < len(self.history) - 1:
-            self.history = self.history[:self.history_position + 1]
-        
-        # Add current state to history
-        self.history.append(self.canvas.copy())
-        self.history_position = len(self.history) - 1
-        
-        # Limit history size
-        if len(self.history) > 10:
-            self.history.pop(0)
-            self.history_position -= 1
+        """Add the changes to the canvas since the last action to history"""
+        self.history.commit()
 
     def undo(self):
         """Undo the last action"""
-        if self.history_position > 0:
-            self.history_position -= 1
-            self.canvas = self.history[self.history_position].copy()
+        box = self.history.undo()
+        if box:
+            self.renderer.mark(*self.view.to_view_box(*box))
             self.draw_interface()
 
     def redo(self):
         """Redo the last undone action"""
-        if self.history_position < len(self.history) - 1:
-            self.history_position += 1
-            self.canvas = self.history[self.history_position].copy()
+        box = self.history.redo()
+        if box:
+            self.renderer.mark(*self.view.to_view_box(*box))
             self.draw_interface()
 
     def normal_effect(self):
@@ -165,9 +220,10 @@ class InteractiveDigitalPalette:
 
     def blur_effect(self):
         """Apply blur effect to canvas"""
-        self.canvas = cv2.GaussianBlur(self.canvas, (15, 15), 0)
+        self.canvas.apply(lambda image: cv2.GaussianBlur(image, (15, 15), 0), halo=7)
         self.add_to_history()
         self.current_effect = 1
+        self.renderer.invalidate()
         self.draw_interface()
 
     def sharpen_effect(self):
@@ -175,141 +231,122 @@ class InteractiveDigitalPalette:
         kernel = np.array([[-1, -1, -1], 
                           [-1, 9, -1], 
                           [-1, -1, -1]])
-        self.canvas = cv2.filter2D(self.canvas, -1, kernel)
+        self.canvas.apply(lambda image: cv2.filter2D(image, -1, kernel), halo=1)
         self.add_to_history()
         self.current_effect = 2
+        self.renderer.invalidate()
         self.draw_interface()
 
     def grayscale_effect(self):
         """Convert canvas to grayscale"""
-        gray = cv2.cvtColor(self.canvas, cv2.COLOR_BGR2GRAY)
-        self.canvas = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        self.canvas.apply(lambda image: cv2.cvtColor(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2BGR))
         self.add_to_history()
         self.current_effect = 3
+        self.renderer.invalidate()
+        self.draw_interface()
+
+    def pan(self, dx, dy):
+        """Move the view over the canvas by (dx, dy) window pixels"""
+        self.view.pan(dx, dy)
+        self.renderer.invalidate()
         self.draw_interface()
 
+    def zoom(self, factor, x=None, y=None):
+        """Zoom the view around a point of the canvas area, its centre by default"""
+        self.view.zoom_at(self.width // 2 if x is None else x, self.height // 2 if y is None else y, factor)
+        self.renderer.invalidate()
+        self.draw_interface()
+
+    def reset_view(self):
+        """Back to the top left of the canvas at 100%"""
+        self.view.reset()
+        self.renderer.invalidate()
+        self.draw_interface()
+
+    def show(self, display):
+        """Show the display in the window, unless running headless"""
+        if not self.headless:
+            cv2.imshow(self.window_name, display)
+
     def draw_interface(self):
         """Draw the interface with tools and color palette"""
-        # Create display with interface at top
-        display = np.ones((self.height + self.interface_height, self.width, 3), dtype=np.uint8) * 240
-        
-        # Copy canvas to display
-        display[self.interface_height:, :] = self.canvas
+        with self.profiler.stage("render"):
+            self.render_interface()
+
+    def render_interface(self):
+        """Bring the display up to date with the canvas and toolbar"""
+        display = self.renderer.render(self.view, self.toolbar_state())
         
+        # Update display
+        self.show(display)
+
+    def toolbar_state(self):
+        """Everything the toolbar shows, it is drawn again when this changes"""
+        return (self.layout, self.current_color, self.custom_r, self.custom_g, self.custom_b,
+                self.current_brush_index, self.eraser_mode, self.current_effect, self.status_text)
+
+    def render_toolbar(self, display):
+        """Draw the toolbar, with its tools and color palette, at the top of the display"""
         # Draw interface background
         cv2.rectangle(display, (0, 0), (self.width, self.interface_height), (220, 220, 220), -1)
         cv2.line(display, (0, self.interface_height), (self.width, self.interface_height), (0, 0, 0), 2)
         
-        # Draw color palette
-        color_width = 30
-        color_height = 30
-        color_margin = 10
-        color_start_x = 20
-        color_start_y = 20
-        
-        for i, color_data in enumerate(self.colors):
-            color = color_data["color"]
-            x = color_start_x + i * (color_width + color_margin)
-            y = color_start_y
-            
-            # Draw color box
-            cv2.rectangle(display, (x, y), (x + color_width, y + color_height), color, -1)
-            cv2.rectangle(display, (x, y), (x + color_width, y + color_height), (0, 0, 0), 1)
-            
-            # Highlight selected color
-            if color == self.current_color:
-                cv2.rectangle(display, (x-2, y-2), (x + color_width+2, y + color_height+2), (0, 0, 0), 2)
-        
-        # Draw custom color preview
-        custom_x = color_start_x + len(self.colors) * (color_width + color_margin) + 20
-        custom_y = color_start_y
-        cv2.rectangle(display, (custom_x, custom_y), (custom_x + 60, custom_y + 30), 
-                     (self.custom_b, self.custom_g, self.custom_r), -1)
-        cv2.rectangle(display, (custom_x, custom_y), (custom_x + 60, custom_y + 30), (0, 0, 0), 1)
-        cv2.putText(display, "Custom", (custom_x, custom_y + 50), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-        
-        # Draw brush sizes
-        brush_start_x = custom_x + 100
-        brush_start_y = color_start_y + 15
-        
-        for i, size in enumerate(self.brush_sizes):
-            x = brush_start_x + i * 40
-            
-            # Draw brush size preview
-            cv2.circle(display, (x, brush_start_y), size, (0, 0, 0), -1)
-            
-            # Highlight selected size
-            if i == self.current_brush_index:
-                cv2.circle(display, (x, brush_start_y), size + 5, (0, 0, 0), 1)
-        
-        # Draw tools
-        tool_start_x = brush_start_x + len(self.brush_sizes) * 40 + 40
-        tool_start_y = color_start_y
-        tool_width = 80
-        tool_height = 30
-        
-        for i, tool in enumerate(self.tools):
-            x = tool_start_x + i * (tool_width + 10)
+        for widget in self.layout.widgets:
+            x0, y0, x1, y1 = widget.box
             
-            # Draw tool button
-            cv2.rectangle(display, (x, tool_start_y), (x + tool_width, tool_start_y + tool_height), 
-                         (200, 200, 200), -1)
-            cv2.rectangle(display, (x, tool_start_y), (x + tool_width, tool_start_y + tool_height), 
-                         (0, 0, 0), 1)
+            if widget.kind == "color":
+                # Draw color box
+                color = self.colors[widget.index]["color"]
+                cv2.rectangle(display, (x0, y0), (x1, y1), color, -1)
+                cv2.rectangle(display, (x0, y0), (x1, y1), (0, 0, 0), 1)
+                
+                # Highlight selected color
+                if color == self.current_color:
+                    cv2.rectangle(display, (x0-2, y0-2), (x1+2, y1+2), (0, 0, 0), 2)
             
-            # Draw tool name
-            cv2.putText(display, f"{tool['icon']} {tool['name']}", (x + 5, tool_start_y + 20), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1)
+            elif widget.kind == "custom":
+                # Draw custom color preview
+                cv2.rectangle(display, (x0, y0), (x1, y1), (self.custom_b, self.custom_g, self.custom_r), -1)
+                cv2.rectangle(display, (x0, y0), (x1, y1), (0, 0, 0), 1)
+                cv2.putText(display, "Custom", (x0, y0 + 50), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
             
-            # Highlight eraser if selected
-            if tool["name"] == "Eraser" and self.eraser_mode:
-                cv2.rectangle(display, (x-2, tool_start_y-2), 
-                             (x + tool_width+2, tool_start_y + tool_height+2), 
-                             (0, 0, 255), 2)
-        
-        # Draw effects
-        effect_start_x = 20
-        effect_start_y = color_start_y + 60
-        effect_width = 80
-        effect_height = 30
-        
-        for i, effect in enumerate(self.effects):
-            x = effect_start_x + i * (effect_width + 10)
-            
-            # Draw effect button
-            cv2.rectangle(display, (x, effect_start_y), (x + effect_width, effect_start_y + effect_height), 
-                         (200, 200, 200), -1)
-            cv2.rectangle(display, (x, effect_start_y), (x + effect_width, effect_start_y + effect_height), 
-                         (0, 0, 0), 1)
+            elif widget.kind == "brush":
+                # Draw brush size preview
+                size = self.brush_sizes[widget.index]
+                center = ((x0 + x1) // 2, (y0 + y1) // 2)
+                cv2.circle(display, center, size, (0, 0, 0), -1)
+                
+                # Highlight selected size
+                if widget.index == self.current_brush_index:
+                    cv2.circle(display, center, size + 5, (0, 0, 0), 1)
             
-            # Draw effect name
-            cv2.putText(display, effect["name"], (x + 5, effect_start_y + 20), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1)
+            elif widget.kind == "status":
+                cv2.putText(display, self.status_text, (x0, y0 + 20), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
             
-            # Highlight selected effect
-            if i == self.current_effect:
-                cv2.rectangle(display, (x-2, effect_start_y-2), 
-                             (x + effect_width+2, effect_start_y + effect_height+2), 
-                             (0, 0, 255), 2)
-        
-        # Draw undo/redo buttons
-        undo_x = effect_start_x + len(self.effects) * (effect_width + 10) + 20
-        undo_y = effect_start_y
-        
-        cv2.rectangle(display, (undo_x, undo_y), (undo_x + 60, undo_y + 30), (200, 200, 200), -1)
-        cv2.rectangle(display, (undo_x, undo_y), (undo_x + 60, undo_y + 30), (0, 0, 0), 1)
-        cv2.putText(display, "Undo", (undo_x + 10, undo_y + 20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-        
-        redo_x = undo_x + 70
-        cv2.rectangle(display, (redo_x, undo_y), (redo_x + 60, undo_y + 30), (200, 200, 200), -1)
-        cv2.rectangle(display, (redo_x, undo_y), (redo_x + 60, undo_y + 30), (0, 0, 0), 1)
-        cv2.putText(display, "Redo", (redo_x + 10, undo_y + 20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-        
-        # Update display
-        cv2.imshow(self.window_name, display)
+            else:
+                # Draw tool, effect, undo and redo buttons
+                cv2.rectangle(display, (x0, y0), (x1, y1), (200, 200, 200), -1)
+                cv2.rectangle(display, (x0, y0), (x1, y1), (0, 0, 0), 1)
+                
+                if widget.kind == "tool":
+                    tool = self.tools[widget.index]
+                    cv2.putText(display, f"{tool['icon']} {tool['name']}", (x0 + 5, y0 + 20), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1)
+                    selected = tool["name"] == "Eraser" and self.eraser_mode
+                elif widget.kind == "effect":
+                    cv2.putText(display, self.effects[widget.index]["name"], (x0 + 5, y0 + 20), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1)
+                    selected = widget.index == self.current_effect
+                else:
+                    cv2.putText(display, widget.kind.capitalize(), (x0 + 10, y0 + 20), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+                    selected = False
+                
+                # Highlight the eraser when selected, and the current effect
+                if selected:
+                    cv2.rectangle(display, (x0-2, y0-2), (x1+2, y1+2), (0, 0, 255), 2)
 
     def mouse_callback(self, event, x, y, flags, param):
         """Handle mouse events"""
@@ -326,105 +363,79 @@ class InteractiveDigitalPalette:
         if canvas_y >= 0:
             if event == cv2.EVENT_LBUTTONDOWN:
                 self.drawing = True
-                self.last_point = (x, canvas_y)
+                self.last_point = self.view.to_canvas(x, canvas_y)
             elif event == cv2.EVENT_MOUSEMOVE:
                 if self.drawing:
-                    draw_color = (255, 255, 255) if self.eraser_mode else self.current_color
-                    current_size = self.brush_sizes[self.current_brush_index]
-                    
-                    if self.last_point:
-                        cv2.line(self.canvas, self.last_point, (x, canvas_y), draw_color, current_size)
-                        
-                    # Always draw a circle at the current point for better continuity
-                    cv2.circle(self.canvas, (x, canvas_y), current_size // 2, draw_color, -1)
-                    
-                    self.last_point = (x, canvas_y)
+                    stroke_start = time.perf_counter()
+                    self.draw_segment(self.view.to_canvas(x, canvas_y))
                     self.draw_interface()
+                    self.profiler.record("stroke", time.perf_counter() - stroke_start)
+                elif self.pan_from:
+                    self.pan(self.pan_from[0] - x, self.pan_from[1] - y)
+                    self.pan_from = (x, y)
             elif event == cv2.EVENT_LBUTTONUP:
                 if self.drawing:
                     self.drawing = False
                     self.last_point = None
                     self.add_to_history()
+            # Drag with the right button to pan, scroll to zoom
+            elif event == cv2.EVENT_RBUTTONDOWN:
+                self.pan_from = (x, y)
+            elif event == cv2.EVENT_RBUTTONUP:
+                self.pan_from = None
+            elif event == cv2.EVENT_MOUSEWHEEL:
+                self.zoom(1.25 if cv2.getMouseWheelDelta(flags) > 0 else 0.8, x, canvas_y)
+
+    def draw_segment(self, point):
+        """Draw the brush from the last point to `point`, both in canvas pixels"""
+        draw_color = (255, 255, 255) if self.eraser_mode else self.current_color
+        current_size = self.brush_sizes[self.current_brush_index]
+        
+        # Draw on a patch of the canvas around the segment only
+        x0, y0 = self.last_point or point
+        pad = current_size // 2 + 2
+        box = self.canvas.clip(min(x0, point[0]) - pad, min(y0, point[1]) - pad,
+                               max(x0, point[0]) + pad + 1, max(y0, point[1]) + pad + 1)
+        self.last_point = point
+        if box[0] >= box[2] or box[1] >= box[3]:
+            return
+        patch = self.canvas.read(*box)
+        start = (x0 - box[0], y0 - box[1])
+        end = (point[0] - box[0], point[1] - box[1])
+        cv2.line(patch, start, end, draw_color, current_size)
+        
+        # Always draw a circle at the current point for better continuity
+        cv2.circle(patch, end, current_size // 2, draw_color, -1)
+        self.canvas.write(box[0], box[1], patch)
+        
+        # Only the bounding box of the new segment needs redrawing
+        self.renderer.mark(*self.view.to_view_box(*box))
 
     def handle_interface_click(self, x, y):
         """Handle clicks in the interface area"""
-        # Check color palette clicks
-        color_width = 30
-        color_height = 30
-        color_margin = 10
-        color_start_x = 20
-        color_start_y = 20
-        
-        for i, color_data in enumerate(self.colors):
-            color = color_data["color"]
-            cx = color_start_x + i * (color_width + color_margin)
-            cy = color_start_y
-            
-            if cx <= x <= cx + color_width and cy <= y <= cy + color_height:
-                self.current_color = color
-                self.eraser_mode = False
-                self.draw_interface()
-                return
+        widget = self.layout.hit(x, y)
+        if widget is None:
+            return
         
-        # Check custom color preview click
-        custom_x = color_start_x + len(self.colors) * (color_width + color_margin) + 20
-        custom_y = color_start_y
-        if custom_x <= x <= custom_x + 60 and custom_y <= y <= custom_y + 30:
+        if widget.kind == "color":
+            self.current_color = self.colors[widget.index]["color"]
+            self.eraser_mode = False
+            self.draw_interface()
+        elif widget.kind == "custom":
             self.current_color = (self.custom_b, self.custom_g, self.custom_r)
             self.eraser_mode = False
             self.draw_interface()
-            return
-            
-        # Check brush size clicks
-        brush_start_x = custom_x + 100
-        brush_start_y = color_start_y + 15
-        
-        for i, size in enumerate(self.brush_sizes):
-            bx = brush_start_x + i * 40
-            
-            if abs(x - bx) <= 20 and abs(y - brush_start_y) <= 20:
-                self.current_brush_index = i
-                self.draw_interface()
-                return
-        
-        # Check tool clicks
-        tool_start_x = brush_start_x + len(self.brush_sizes) * 40 + 40
-        tool_start_y = color_start_y
-        tool_width = 80
-        tool_height = 30
-        
-        for i, tool in enumerate(self.tools):
-            tx = tool_start_x + i * (tool_width + 10)
-            
-            if tx <= x <= tx + tool_width and tool_start_y <= y <= tool_start_y + tool_height:
-                tool["action"]()
-                return
-        
-        # Check effect clicks
-        effect_start_x = 20
-        effect_start_y = color_start_y + 60
-        effect_width = 80
-        effect_height = 30
-        
-        for i, effect in enumerate(self.effects):
-            ex = effect_start_x + i * (effect_width + 10)
-            
-            if ex <= x <= ex + effect_width and effect_start_y <= y <= effect_start_y + effect_height:
-                effect["action"]()
-                return
-        
-        # Check undo/redo buttons
-        undo_x = effect_start_x + len(self.effects) * (effect_width + 10) + 20
-        undo_y = effect_start_y
-        
-        if undo_x <= x <= undo_x + 60 and undo_y <= y <= undo_y + 30:
+        elif widget.kind == "brush":
+            self.current_brush_index = widget.index
+            self.draw_interface()
+        elif widget.kind == "tool":
+            self.tools[widget.index]["action"]()
+        elif widget.kind == "effect":
+            self.effects[widget.index]["action"]()
+        elif widget.kind == "undo":
             self.undo()
-            return
-            
-        redo_x = undo_x + 70
-        if redo_x <= x <= redo_x + 60 and undo_y <= y <= undo_y + 30:
+        elif widget.kind == "redo":
             self.redo()
-            return
 
     def run(self):
         """Run the main application loop"""
@@ -438,10 +449,15 @@ class InteractiveDigitalPalette:
         print("- Press 'z' for undo, 'y' for redo")
         print("- Press 'c' to clear canvas")
         print("- Press 's' to save your artwork")
+        print("- Drag with the right button or press 'i', 'j', 'k', 'l' to pan")
+        print("- Scroll or press '+' and '-' to zoom, '0' to reset the view")
         print("- Press 'ESC' to exit")
         print("==================================\n")
         
         while True:
+            self.autosave()
+            self.update_status()
+            
             # Check for keyboard shortcuts
             key = cv2.waitKey(1) & 0xFF
             
@@ -459,10 +475,39 @@ class InteractiveDigitalPalette:
                 self.select_brush()
             elif key == ord('e'):  # Eraser
                 self.select_eraser()
+            elif key in (ord('+'), ord('=')):  # Zoom in
+                self.zoom(1.25)
+            elif key == ord('-'):  # Zoom out
+                self.zoom(0.8)
+            elif key == ord('0'):  # Reset view
+                self.reset_view()
+            elif key in (ord('i'), ord('j'), ord('k'), ord('l')):  # Pan
+                step = self.width // 4
+                dx = {ord('j'): -step, ord('l'): step}.get(key, 0)
+                dy = {ord('i'): -step, ord('k'): step}.get(key, 0)
+                self.pan(dx, dy)
                 
         cv2.destroyAllWindows()
+        
+        # Let the saves still running finish
+        self.saver.stop()
+        self.profiler.print_summary()
+        print("Canvas:", self.canvas.stats())
+        print("History:", self.history.stats())
+        print("Saves:", self.saver.stats())
 
 
 if __name__ == "__main__":
-    app = InteractiveDigitalPalette()
+    parser = argparse.ArgumentParser(description="Draw with the mouse on a canvas of any size")
+    parser.add_argument("--canvas-size", default="1024x768",
+                        help='canvas size, e.g. "16384x16384"; larger than the window, it is panned and zoomed')
+    parser.add_argument("--spill-dir", help="keep the canvas tiles in a memory-mapped file in this directory")
+    parser.add_argument("--export", default="png",
+                        help='formats written by save, format:quality@thumbnail size, e.g. "png:9,jpg:90,jpg:80@256"')
+    parser.add_argument("--autosave", type=float, default=0, help="save to autosave.png every this many seconds")
+    args = parser.parse_args()
+    
+    app = InteractiveDigitalPalette(canvas_size=tuple(int(v) for v in args.canvas_size.split("x")),
+                                    spill_dir=args.spill_dir, export_formats=parse_exports(args.export),
+                                    autosave_every=args.autosave)
     app.run()
\ No newline at end of file
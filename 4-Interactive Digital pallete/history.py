@@ -0,0 +1,110 @@
+import zlib
+from collections import deque
+
+import numpy as np
+
+
+class TileHistory:
+    """Undo/redo history that stores only the tiles an action changed.
+
+    It hooks into a TiledCanvas and saves the contents of a tile the first
+    time the tile changes after a commit, zlib compressed unless `compress`
+    is False (blank tiles are stored as None). commit() closes the action,
+    dropping tiles that ended up unchanged. Undo and redo swap the saved
+    tiles with the canvas, so they cost as much as the change rather than
+    the canvas. The oldest actions are forgotten when the history holds
+    more than `memory_budget` bytes or `max_levels` actions.
+    """
+
+    def __init__(self, canvas, memory_budget=64 * 2 ** 20, max_levels=1000, compress=True):
+        self.canvas = canvas
+        self.memory_budget = memory_budget
+        self.max_levels = max_levels
+        self.compress = compress
+        self.pending = {}
+        self.undo_actions = deque()
+        self.redo_actions = []
+        self.bytes = 0
+        canvas.before_change = self._remember
+
+    def _pack(self, tile):
+        if tile is None:
+            return None
+        data = tile.tobytes()
+        return zlib.compress(data, 1) if self.compress else data
+
+    def _unpack(self, payload, key):
+        if payload is None:
+            return None
+        data = zlib.decompress(payload) if self.compress else payload
+        return np.frombuffer(data, dtype=np.uint8).reshape(self.canvas.tile_shape(key))
+
+    @staticmethod
+    def _size(action):
+        return sum(len(payload) for _, payload in action if payload is not None)
+
+    def _remember(self, key):
+        if key not in self.pending:
+            self.pending[key] = self._pack(self.canvas.tiles.get(key))
+
+    def commit(self):
+        """Record the changes since the last commit as one action, returns False if nothing changed"""
+        action = []
+        for key, payload in self.pending.items():
+            before, after = self._unpack(payload, key), self.canvas.tiles.get(key)
+            if before is None and after is None:
+                continue
+            if before is not None and after is not None and np.array_equal(before, after):
+                continue
+            action.append((key, payload))
+        self.pending = {}
+        if not action:
+            return False
+        self.bytes -= sum(self._size(redo) for redo in self.redo_actions)
+        self.redo_actions.clear()
+        self.undo_actions.append(action)
+        self.bytes += self._size(action)
+        while self.undo_actions and (self.bytes > self.memory_budget or len(self.undo_actions) > self.max_levels):
+            self.bytes -= self._size(self.undo_actions.popleft())
+        return True
+
+    def _swap(self, action):
+        """Put the stored tiles on the canvas, returns the action that puts back what they replaced"""
+        swapped = []
+        for key, payload in action:
+            swapped.append((key, self._pack(self.canvas.tiles.get(key))))
+            self.canvas.replace_tile(key, self._unpack(payload, key))
+        self.bytes += self._size(swapped) - self._size(action)
+        return swapped
+
+    def _box(self, action):
+        boxes = [self.canvas.tile_box(key) for key, _ in action]
+        return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+    def undo(self):
+        """Undo the last action, returns the canvas box (x0, y0, x1, y1) it changed or None"""
+        # Changes not committed yet are the last action
+        self.commit()
+        if not self.undo_actions:
+            return None
+        action = self.undo_actions.pop()
+        self.redo_actions.append(self._swap(action))
+        return self._box(action)
+
+    def redo(self):
+        """Redo the last undone action, returns the canvas box it changed or None"""
+        # New changes make the undone actions unreachable, as with any commit
+        self.commit()
+        if not self.redo_actions:
+            return None
+        action = self.redo_actions.pop()
+        self.undo_actions.append(self._swap(action))
+        return self._box(action)
+
+    def stats(self):
+        return {
+            "undo_levels": len(self.undo_actions),
+            "redo_levels": len(self.redo_actions),
+            "megabytes": round(self.bytes / 2 ** 20, 2),
+        }
@@ -0,0 +1,120 @@
+from collections import namedtuple
+
+import numpy as np
+
+# One control of the toolbar: its kind ("color", "brush", "tool"...), its
+# index in that kind's list, the box it is drawn in and the box that
+# answers clicks, both (x0, y0, x1, y1) with the far edges included
+Widget = namedtuple("Widget", "kind index box hit")
+
+# Geometry of the toolbar
+COLOR_SIZE = 30
+COLOR_MARGIN = 10
+START_X = 20
+START_Y = 20
+BRUSH_SPACING = 40
+BUTTON_WIDTH = 80
+BUTTON_HEIGHT = 30
+BUTTON_MARGIN = 10
+SMALL_BUTTON_WIDTH = 60
+STATUS_MIN_WIDTH = 150
+# Distance between the rows of controls, and the room kept free at the right edge
+ROW_HEIGHT = 60
+RIGHT_MARGIN = 10
+
+
+class ToolbarLayout:
+    """Where every control of the toolbar is, for drawing it and for clicks.
+
+    The toolbar is drawn from `widgets` and clicks are answered by hit(),
+    so the two can never disagree. hit() reads the widget index from a
+    map with one entry per toolbar pixel, filled once when the layout is
+    built, so a click costs the same with 10 controls or 1000. Where hit
+    boxes overlap, the widget added first wins.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.widgets = []
+        self.hit_map = np.full((height, width), -1, dtype=np.int32)
+
+    def add(self, kind, index, box, hit=None):
+        x0, y0, x1, y1 = hit or box
+        region = self.hit_map[max(y0, 0):max(y1 + 1, 0), max(x0, 0):max(x1 + 1, 0)]
+        region[region < 0] = len(self.widgets)
+        self.widgets.append(Widget(kind, index, box, hit or box))
+
+    def hit(self, x, y):
+        """The widget under (x, y), or None"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        index = self.hit_map[y, x]
+        return self.widgets[index] if index >= 0 else None
+
+
+class _Flow:
+    """Places boxes left to right in rows, starting a new row where one would pass the right edge"""
+
+    def __init__(self, width):
+        self.width = width
+        self.x = START_X
+        self.y = START_Y
+        self.row_empty = True
+        self.placed = []
+
+    def new_row(self):
+        if not self.row_empty:
+            self.x = START_X
+            self.y += ROW_HEIGHT
+            self.row_empty = True
+
+    def place(self, kind, index, gap, width, box=None, hit=None):
+        """Place a `width` wide slot `gap` pixels after the last one; box and hit are
+        functions of the slot's (x, y) and default to the slot itself"""
+        x = self.x + (0 if self.row_empty else gap)
+        if not self.row_empty and self._right(x, width, box, hit) > self.width - RIGHT_MARGIN:
+            self.new_row()
+            x = self.x
+        slot = (x, self.y, x + width, self.y + BUTTON_HEIGHT)
+        self.placed.append((kind, index, box(x, self.y) if box else slot, hit(x, self.y) if hit else None))
+        self.x = x + width
+        self.row_empty = False
+
+    def _right(self, x, width, box, hit):
+        return max(x + width, box(x, self.y)[2] if box else 0, hit(x, self.y)[2] if hit else 0)
+
+
+def toolbar_layout(width, height, colors, brush_sizes, tools, effects):
+    """Lay out the color swatches, custom color, brush sizes and tools, then on a new row
+    the effects, undo/redo and the status line. Controls that would pass the right
+    edge of the window go on the next row, and the toolbar grows to `height` or
+    more to hold every row"""
+    flow = _Flow(width)
+    for i in range(len(colors)):
+        flow.place("color", i, COLOR_MARGIN, COLOR_SIZE)
+    flow.place("custom", 0, COLOR_MARGIN + 20, SMALL_BUTTON_WIDTH)
+
+    # Brush previews are circles around a centre, clickable 20 pixels around it
+    for i, size in enumerate(brush_sizes):
+        flow.place("brush", i, 20 if i == 0 else 0, BRUSH_SPACING,
+                   lambda x, y, size=size: (x + 20 - size, y + 15 - size, x + 20 + size, y + 15 + size),
+                   lambda x, y: (x, y - 5, x + 40, y + 35))
+
+    for i in range(len(tools)):
+        flow.place("tool", i, 60 if i == 0 else BUTTON_MARGIN, BUTTON_WIDTH)
+
+    flow.new_row()
+    for i in range(len(effects)):
+        flow.place("effect", i, BUTTON_MARGIN, BUTTON_WIDTH)
+    flow.place("undo", 0, BUTTON_MARGIN + 20, SMALL_BUTTON_WIDTH)
+    flow.place("redo", 0, 10, SMALL_BUTTON_WIDTH)
+
+    # Progress of saves, in the rest of the row
+    flow.place("status", 0, 30, STATUS_MIN_WIDTH,
+               lambda x, y: (x, y, max(width - RIGHT_MARGIN, x + STATUS_MIN_WIDTH), y + BUTTON_HEIGHT))
+
+    layout = ToolbarLayout(width, max(height, flow.y + BUTTON_HEIGHT + 10))
+    for kind, index, box, hit in flow.placed:
+        layout.add(kind, index, box, hit)
+    return layout
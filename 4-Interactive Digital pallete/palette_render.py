@@ -0,0 +1,72 @@
+import numpy as np
+
+
+def union(box, other):
+    """Smallest (x0, y0, x1, y1) box holding both, either can be None"""
+    if box is None:
+        return other
+    if other is None:
+        return box
+    return min(box[0], other[0]), min(box[1], other[1]), max(box[2], other[2]), max(box[3], other[3])
+
+
+class DirtyRenderer:
+    """Keeps the window image between frames and redraws only what changed.
+
+    The display buffer is allocated once. The toolbar is drawn by
+    `draw_toolbar(image)` into its own strip and only again when the key
+    passed to render() changes (the selected color, brush, tool...). Changes
+    to the canvas area are marked as rectangles with mark(), or as the whole
+    area with invalidate(), and render() has the view (a Viewport) draw just
+    those pixels, so a brush segment costs about as much as its bounding box.
+
+    The toolbar may reach `overlap` rows into the canvas, like the two pixel
+    separator line; those rows are pasted back over any canvas update.
+    """
+
+    def __init__(self, width, height, toolbar_height, draw_toolbar, overlap=2):
+        self.width = width
+        self.height = height
+        self.toolbar_height = toolbar_height
+        self.draw_toolbar = draw_toolbar
+        self.display = np.empty((toolbar_height + height, width, 3), dtype=np.uint8)
+        self.toolbar = np.empty((toolbar_height + overlap, width, 3), dtype=np.uint8)
+        self.toolbar_key = None
+        self.dirty = None
+        self.full = True
+
+    def invalidate(self):
+        """The whole canvas changed"""
+        self.full = True
+
+    def mark(self, x0, y0, x1, y1):
+        """Pixels in [x0, x1) x [y0, y1) of the canvas area changed"""
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width), min(y1, self.height)
+        if x0 < x1 and y0 < y1:
+            self.dirty = union(self.dirty, (x0, y0, x1, y1))
+
+    def render(self, view, toolbar_key):
+        """Bring the display up to date with the view and toolbar, returns the display"""
+        top = self.toolbar_height
+        overlap = self.toolbar.shape[0] - top
+        toolbar_changed = toolbar_key != self.toolbar_key
+        if toolbar_changed:
+            self.toolbar[:] = 220
+            self.draw_toolbar(self.toolbar)
+            self.toolbar_key = toolbar_key
+
+        if self.full:
+            view.draw(self.display[top:], 0, 0, self.width, self.height)
+            self.display[:top + overlap] = self.toolbar
+        else:
+            if self.dirty is not None:
+                x0, y0, x1, y1 = self.dirty
+                view.draw(self.display[top + y0:top + y1, x0:x1], x0, y0, x1, y1)
+                if y0 < overlap:
+                    self.display[top + y0:top + overlap, x0:x1] = self.toolbar[top + y0:, x0:x1]
+            if toolbar_changed:
+                self.display[:top + overlap] = self.toolbar
+        self.full = False
+        self.dirty = None
+        return self.display
@@ -0,0 +1,212 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque, namedtuple
+
+import cv2
+import numpy as np
+
+from common.timing import LatencyHistogram
+
+# One output of a save: file extension, quality (PNG compression level
+# 0-9, JPEG or WebP quality 0-100, None for OpenCV's default) and the
+# longest side in pixels for a downscaled copy, None for full size
+ExportFormat = namedtuple("ExportFormat", "extension quality max_size")
+
+QUALITY_FLAGS = {
+    "png": cv2.IMWRITE_PNG_COMPRESSION,
+    "jpg": cv2.IMWRITE_JPEG_QUALITY,
+    "jpeg": cv2.IMWRITE_JPEG_QUALITY,
+    "webp": cv2.IMWRITE_WEBP_QUALITY,
+}
+
+# How long the result of a save stays in the status line
+STATUS_SECONDS = 3.0
+
+
+
+def parse_exports(text):
+    """Parse "png:3,jpg:90,jpg:80@256" (format:quality@thumbnail size) into ExportFormats"""
+    formats = []
+    for item in filter(None, (text or "").split(",")):
+        item, _, max_size = item.strip().partition("@")
+        extension, _, quality = item.partition(":")
+        extension = extension.lower()
+        if extension not in QUALITY_FLAGS:
+            raise ValueError(f"Unknown export format: {extension}")
+        formats.append(ExportFormat(extension, int(quality) if quality else None,
+                                    int(max_size) if max_size else None))
+    return formats
+
+
+def export_names(base, formats):
+    """File name of every format, e.g. artwork.png and artwork_256px.jpg"""
+    names = []
+    for extension, quality, max_size in formats:
+        name = base + (f"_{max_size}px" if max_size else "")
+        if f"{name}.{extension}" in names:
+            name += f"_q{quality}"
+        names.append(f"{name}.{extension}")
+    return names
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def write_png(path, canvas, level=None):
+    """Write a TiledCanvas as an RGB PNG one row of tiles at a time, never holding the whole image.
+
+    Every scanline uses PNG's Sub filter (each byte minus the one a pixel
+    to its left), which is cheap with NumPy and suits flat drawn colors.
+    Without a level the compression is OpenCV's default, fast run-length
+    coding, which makes about the same files as cv2.imwrite().
+    """
+    if level is None:
+        compressor = zlib.compressobj(1, zlib.DEFLATED, 15, 8, zlib.Z_RLE)
+    else:
+        compressor = zlib.compressobj(level)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", canvas.width, canvas.height, 8, 2, 0, 0, 0)))
+        for y0 in range(0, canvas.height, canvas.tile_size):
+            band = canvas.read(0, y0, canvas.width, min(y0 + canvas.tile_size, canvas.height))
+            pixels = cv2.cvtColor(band, cv2.COLOR_BGR2RGB).reshape(len(band), -1)
+            rows = np.empty((len(band), 1 + pixels.shape[1]), dtype=np.uint8)
+            rows[:, 0] = 1
+            rows[:, 1:4] = pixels[:, :3]
+            np.subtract(pixels[:, 3:], pixels[:, :-3], out=rows[:, 4:])
+            data = compressor.compress(rows.tobytes())
+            if data:
+                f.write(_png_chunk(b"IDAT", data))
+        f.write(_png_chunk(b"IDAT", compressor.flush()))
+        f.write(_png_chunk(b"IEND", b""))
+
+
+class SaveJob:
+    """One save: a canvas snapshot and the files to write from it"""
+
+    def __init__(self, canvas, base, formats, label):
+        self.canvas = canvas
+        self.formats = formats
+        self.paths = export_names(base, formats)
+        self.label = label
+        self.written = 0
+        self.error = None
+        self.finished = None
+
+    def status(self):
+        if self.error:
+            return f"{self.label} failed: {self.error}"
+        if self.finished is not None:
+            return f"Saved {', '.join(os.path.basename(path) for path in self.paths)}"
+        return f"{self.label} {self.written}/{len(self.paths)}..."
+
+
+class BackgroundSaver:
+    """Writes images on a dedicated thread, so saving never stalls drawing.
+
+    save() takes a snapshot of the canvas (see TiledCanvas.snapshot()) and
+    returns at once; the writer thread writes every export format from it.
+    Thumbnails are shrunk from the painted tiles (TiledCanvas.scaled()) and
+    full-size PNGs are written a row of tiles at a time, so neither needs
+    the whole canvas as one image; only full-size JPEG and WebP do. Files
+    are written under a temporary name and renamed when complete, so an
+    auto-save never leaves a half-written file behind. status() is the line
+    to show the user while a save runs and for a few seconds after.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.jobs = deque()
+        self.current = None
+        self.last = None
+        self.stopping = False
+        self.saved = 0
+        self.failed = 0
+        self.latency = LatencyHistogram()
+        self.thread = threading.Thread(target=self._run, name="saver", daemon=True)
+        self.thread.start()
+
+    def save(self, canvas, base, formats, label="Saving"):
+        job = SaveJob(canvas, base, formats, label)
+        with self.condition:
+            self.jobs.append(job)
+            self.condition.notify()
+        return job
+
+    def busy(self):
+        with self.condition:
+            return bool(self.jobs) or self.current is not None
+
+    def _write(self, job):
+        canvas = job.canvas
+        width, height = canvas.width, canvas.height
+        image = None
+        for (extension, quality, max_size), path in zip(job.formats, job.paths):
+            root, suffix = os.path.splitext(path)
+            temporary = f"{root}.tmp{suffix}"
+            if max_size and max(width, height) > max_size:
+                scale = max_size / max(width, height)
+                output = canvas.scaled(max(1, round(width * scale)), max(1, round(height * scale)))
+            elif extension == "png":
+                write_png(temporary, canvas, quality)
+                output = None
+            else:
+                # The JPEG and WebP encoders take the whole image at once
+                if image is None:
+                    image = canvas.to_array()
+                output = image
+            params = [QUALITY_FLAGS[extension], quality] if quality is not None else []
+            if output is not None and not cv2.imwrite(temporary, output, params):
+                raise IOError(f"Could not write {path}")
+            os.replace(temporary, path)
+            job.written += 1
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.jobs and not self.stopping:
+                    self.condition.wait()
+                if not self.jobs:
+                    return
+                job = self.current = self.jobs.popleft()
+            start = time.perf_counter()
+            try:
+                self._write(job)
+                self.saved += 1
+            except Exception as error:
+                job.error = str(error)
+                self.failed += 1
+            self.latency.record(time.perf_counter() - start)
+            # The snapshot is not needed any more
+            job.canvas = None
+            job.finished = time.monotonic()
+            with self.condition:
+                self.current = None
+                self.last = job
+
+    def status(self):
+        """Progress of the running save, or the result of the last one for a few seconds"""
+        with self.condition:
+            job = self.current or (self.jobs[0] if self.jobs else None)
+            if job is None and self.last is not None and time.monotonic() - self.last.finished < STATUS_SECONDS:
+                job = self.last
+        return job.status() if job is not None else ""
+
+    def stop(self):
+        """Finish the saves still waiting, then stop the thread"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.thread.join()
+
+    def stats(self):
+        return {
+            "saved": self.saved,
+            "failed": self.failed,
+            "write_p50_ms": round(1000 * self.latency.percentile(0.50), 1),
+            "write_max_ms": round(1000 * self.latency.max, 1),
+        }
@@ -0,0 +1,288 @@
+import math
+import tempfile
+
+import numpy as np
+
+
+def _area_weights(out0, out1, scale, in0, in1):
+    # How much of every input pixel in [in0, in1) each output pixel in [out0, out1) covers, rows summing to 1
+    edges = np.arange(out0, out1 + 1) / scale
+    starts = np.arange(in0, in1)
+    overlap = np.minimum(edges[1:, None], starts + 1) - np.maximum(edges[:-1, None], starts)
+    return (np.clip(overlap, 0, None) * scale).astype(np.float32)
+
+
+class TiledCanvas:
+    """A canvas stored as square tiles that exist only once something is drawn on them.
+
+    Blank tiles are implicit and read as `background`, so a 16k x 16k
+    canvas costs memory only where it has been painted. With `spill_dir`
+    the tiles live in a memory-mapped temporary file there instead of in
+    RAM, and the operating system pages them in and out as needed.
+
+    Pixels are read and written as rectangles, read() and write(). Before
+    a tile is changed `before_change(key)` is called, which is how the
+    undo history saves the tiles an action touches, and `version` goes up
+    with every change.
+    """
+
+    def __init__(self, width, height, tile_size=128, background=255, spill_dir=None):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.background = background
+        self.rows = math.ceil(height / tile_size)
+        self.columns = math.ceil(width / tile_size)
+        self.tiles = {}
+        self.before_change = None
+        self.version = 0
+        self.store = None
+        if spill_dir is not None:
+            # Pages of tiles that are never drawn on are never written, the file stays sparse
+            self.spill_file = tempfile.TemporaryFile(dir=spill_dir)
+            self.store = np.memmap(self.spill_file, dtype=np.uint8, mode="w+",
+                                   shape=(self.rows, self.columns, tile_size, tile_size, 3))
+
+    def tile_box(self, key):
+        """Canvas box (x0, y0, x1, y1) of a tile"""
+        row, column = key
+        size = self.tile_size
+        return (column * size, row * size,
+                min((column + 1) * size, self.width), min((row + 1) * size, self.height))
+
+    def tile_shape(self, key):
+        x0, y0, x1, y1 = self.tile_box(key)
+        return y1 - y0, x1 - x0, 3
+
+    def _new_tile(self, key):
+        height, width, _ = self.tile_shape(key)
+        if self.store is not None:
+            tile = self.store[key[0], key[1], :height, :width]
+            tile[:] = self.background
+        else:
+            tile = np.full((height, width, 3), self.background, dtype=np.uint8)
+        self.tiles[key] = tile
+        return tile
+
+    def _spans(self, x0, y0, x1, y1):
+        # (key, slice of the tile, slice of the rectangle) of every tile the rectangle covers
+        size = self.tile_size
+        for row in range(y0 // size, (y1 - 1) // size + 1):
+            top = row * size
+            ys = slice(max(y0, top) - top, min(y1, top + size) - top)
+            out_ys = slice(max(y0, top) - y0, min(y1, top + size) - y0)
+            for column in range(x0 // size, (x1 - 1) // size + 1):
+                left = column * size
+                xs = slice(max(x0, left) - left, min(x1, left + size) - left)
+                out_xs = slice(max(x0, left) - x0, min(x1, left + size) - x0)
+                yield (row, column), (ys, xs), (out_ys, out_xs)
+
+    def clip(self, x0, y0, x1, y1):
+        return max(x0, 0), max(y0, 0), min(x1, self.width), min(y1, self.height)
+
+    def read(self, x0, y0, x1, y1):
+        """Copy of the pixels in [x0, x1) x [y0, y1), which must lie on the canvas"""
+        out = np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        for key, inside, outside in self._spans(x0, y0, x1, y1):
+            tile = self.tiles.get(key)
+            out[outside] = self.background if tile is None else tile[inside]
+        return out
+
+    def write(self, x0, y0, patch):
+        """Store a patch of pixels with its top left corner at (x0, y0)"""
+        x1, y1 = x0 + patch.shape[1], y0 + patch.shape[0]
+        for key, inside, outside in self._spans(x0, y0, x1, y1):
+            tile = self.tiles.get(key)
+            part = patch[outside]
+            if tile is None:
+                # Keep the tile implicit while it stays blank
+                if np.all(part == self.background):
+                    continue
+            elif np.array_equal(tile[inside], part):
+                continue
+            if self.before_change is not None:
+                self.before_change(key)
+            if tile is None:
+                tile = self._new_tile(key)
+            tile[inside] = part
+            self.version += 1
+
+    def replace_tile(self, key, pixels):
+        """Set a whole tile, None makes it blank; used by undo, so before_change is not called"""
+        if pixels is None:
+            self.tiles.pop(key, None)
+        else:
+            tile = self.tiles.get(key)
+            if tile is None:
+                tile = self._new_tile(key)
+            tile[:] = pixels
+        self.version += 1
+
+    def clear(self):
+        for key in list(self.tiles):
+            if self.before_change is not None:
+                self.before_change(key)
+            del self.tiles[key]
+        self.version += 1
+
+    def snapshot(self):
+        """An in-memory copy that later drawing leaves alone, e.g. to save on another thread.
+
+        Only the painted tiles are copied.
+        """
+        copy = TiledCanvas(self.width, self.height, self.tile_size, self.background)
+        copy.tiles = {key: tile.copy() for key, tile in self.tiles.items()}
+        copy.version = self.version
+        return copy
+
+    def apply(self, function, halo=0):
+        """Apply an image filter to the whole canvas one tile at a time.
+
+        `halo` is how far the filter looks around a pixel; tiles are filtered
+        with that much of their neighbours, so the result is the same as
+        filtering the whole image. Blank tiles are skipped unless painted
+        ones are near enough to change them.
+        """
+        size = self.tile_size
+        reach = math.ceil(halo / size)
+        keys = set()
+        for row, column in self.tiles:
+            for dy in range(-reach, reach + 1):
+                for dx in range(-reach, reach + 1):
+                    if 0 <= row + dy < self.rows and 0 <= column + dx < self.columns:
+                        keys.add((row + dy, column + dx))
+        # Filter everything first, the neighbours must not see filtered pixels
+        results = []
+        for key in sorted(keys):
+            x0, y0, x1, y1 = self.tile_box(key)
+            ax0, ay0, ax1, ay1 = self.clip(x0 - halo, y0 - halo, x1 + halo, y1 + halo)
+            filtered = function(self.read(ax0, ay0, ax1, ay1))
+            results.append((x0, y0, filtered[y0 - ay0:y1 - ay0, x0 - ax0:x1 - ax0]))
+        for x0, y0, patch in results:
+            self.write(x0, y0, patch)
+
+    def to_array(self):
+        """The whole canvas as one image"""
+        return self.read(0, 0, self.width, self.height)
+
+    def scaled(self, width, height):
+        """The canvas shrunk to width x height with area averaging, e.g. for a thumbnail.
+
+        Every output pixel averages the canvas pixels it covers, weighted by
+        how much of each it covers, like cv2.INTER_AREA on the whole image.
+        That average is background plus what the painted tiles add to it, so
+        only painted tiles are read, one at a time.
+        """
+        sx, sy = width / self.width, height / self.height
+        total = np.zeros((height, width, 3), dtype=np.float32)
+        row_weights, column_weights = {}, {}
+        for (row, column), tile in self.tiles.items():
+            x0, y0, x1, y1 = self.tile_box((row, column))
+            oy0, oy1 = int(y0 * sy), min(math.ceil(y1 * sy), height)
+            ox0, ox1 = int(x0 * sx), min(math.ceil(x1 * sx), width)
+            if row not in row_weights:
+                row_weights[row] = _area_weights(oy0, oy1, sy, y0, y1)
+            if column not in column_weights:
+                column_weights[column] = _area_weights(ox0, ox1, sx, x0, x1)
+            change = tile.astype(np.float32) - self.background
+            rows = np.tensordot(row_weights[row], change, axes=(1, 0))
+            total[oy0:oy1, ox0:ox1] += np.tensordot(rows, column_weights[column], axes=(1, 1)).transpose(0, 2, 1)
+        total += self.background
+        return np.rint(total).clip(0, 255).astype(np.uint8)
+
+    def stats(self):
+        return {
+            "tiles": len(self.tiles),
+            "of": self.rows * self.columns,
+            "megabytes": round(len(self.tiles) * self.tile_size ** 2 * 3 / 2 ** 20, 1),
+        }
+
+
+class Viewport:
+    """The part of a TiledCanvas shown in the window, panned and zoomed.
+
+    (x, y) is the canvas pixel at the top left of the view and `zoom` the
+    size of a canvas pixel on screen. Only the tiles in view are read: each
+    view pixel shows the canvas pixel under its centre, so zooming out
+    samples the canvas instead of reading all of it.
+    """
+
+    MIN_ZOOM = 1 / 32
+    MAX_ZOOM = 16
+    OUTSIDE = 200
+
+    def __init__(self, canvas, width, height):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.x = 0
+        self.y = 0
+        self.zoom = 1.0
+
+    def to_canvas(self, vx, vy):
+        """Canvas pixel under a view pixel"""
+        return int(math.floor(self.x + (vx + 0.5) / self.zoom)), int(math.floor(self.y + (vy + 0.5) / self.zoom))
+
+    def to_view_box(self, x0, y0, x1, y1):
+        """View box covering a canvas box"""
+        return (math.floor((x0 - self.x) * self.zoom), math.floor((y0 - self.y) * self.zoom),
+                math.ceil((x1 - self.x) * self.zoom) + 1, math.ceil((y1 - self.y) * self.zoom) + 1)
+
+    def clamp(self):
+        # Keep the view on the canvas where it fits, and the pan in whole canvas pixels
+        self.x = int(round(min(max(self.x, 0), max(self.canvas.width - self.width / self.zoom, 0))))
+        self.y = int(round(min(max(self.y, 0), max(self.canvas.height - self.height / self.zoom, 0))))
+
+    def pan(self, dx, dy):
+        """Move the view by (dx, dy) view pixels"""
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+        self.clamp()
+
+    def zoom_at(self, vx, vy, factor):
+        """Zoom by `factor`, keeping the canvas pixel under (vx, vy) in place"""
+        cx, cy = self.x + vx / self.zoom, self.y + vy / self.zoom
+        self.zoom = min(max(self.zoom * factor, self.MIN_ZOOM), self.MAX_ZOOM)
+        self.x, self.y = cx - vx / self.zoom, cy - vy / self.zoom
+        self.clamp()
+
+    def reset(self):
+        self.x, self.y, self.zoom = 0, 0, 1.0
+
+    def draw(self, out, x0, y0, x1, y1):
+        """Fill `out` with the view pixels in [x0, x1) x [y0, y1)"""
+        canvas = self.canvas
+        size = canvas.tile_size
+        xs = np.floor(self.x + (np.arange(x0, x1) + 0.5) / self.zoom).astype(np.intp)
+        ys = np.floor(self.y + (np.arange(y0, y1) + 0.5) / self.zoom).astype(np.intp)
+        out[:] = self.OUTSIDE
+        # View columns and rows on the canvas, then split where they cross into the next tile
+        cols = np.flatnonzero((xs >= 0) & (xs < canvas.width))
+        rows = np.flatnonzero((ys >= 0) & (ys < canvas.height))
+        if not len(cols) or not len(rows):
+            return
+        c0, c1, r0, r1 = cols[0], cols[-1] + 1, rows[0], rows[-1] + 1
+        out[r0:r1, c0:c1] = canvas.background
+        if not canvas.tiles:
+            return
+        column_tiles = xs[c0:c1] // size
+        row_tiles = ys[r0:r1] // size
+        column_edges = np.flatnonzero(np.diff(column_tiles)) + 1
+        row_edges = np.flatnonzero(np.diff(row_tiles)) + 1
+        column_starts = [c0] + (c0 + column_edges).tolist()
+        column_ends = (c0 + column_edges).tolist() + [c1]
+        row_starts = [r0] + (r0 + row_edges).tolist()
+        row_ends = (r0 + row_edges).tolist() + [r1]
+        whole_pixels = self.zoom == 1
+        for top, bottom in zip(row_starts, row_ends):
+            row = ys[top] // size
+            for left, right in zip(column_starts, column_ends):
+                tile = canvas.tiles.get((row, xs[left] // size))
+                if tile is None:
+                    continue
+                tile_ys = ys[top:bottom] - row * size
+                tile_xs = xs[left:right] - xs[left] // size * size
+                if whole_pixels:
+                    out[top:bottom, left:right] = tile[tile_ys[0]:tile_ys[-1] + 1, tile_xs[0]:tile_xs[-1] + 1]
+                else:
+                    out[top:bottom, left:right] = tile[np.ix_(tile_ys, tile_xs)]
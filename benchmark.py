@@ -0,0 +1,195 @@
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from common.sources import open_source
+from common.timing import Profiler
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+VEHICLE_DIR = os.path.join(ROOT, "1-Vehicle Detetion using contour concept")
+SKETCH_DIR = os.path.join(ROOT, "2-Live Sketch")
+MOUSE_DIR = os.path.join(ROOT, "3-My Virtual Mouse")
+PALETTE_DIR = os.path.join(ROOT, "4-Interactive Digital pallete")
+PALETTE_SCRIPT = os.path.join(PALETTE_DIR, "Interactive Digital Palette & Drawing Tool.py")
+
+sys.path.insert(0, VEHICLE_DIR)
+sys.path.insert(0, SKETCH_DIR)
+sys.path.insert(0, MOUSE_DIR)
+sys.path.insert(0, PALETTE_DIR)
+
+
+def load_frames(path, limit, profiler):
+    """Decode up to `limit` frames of any frame source, timing the decoder"""
+    capture = open_source(path)
+    frames = []
+    while len(frames) < limit:
+        with profiler.stage("decode"):
+            ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    if not frames:
+        raise IOError(f"No frames in video: {path}")
+    return frames
+
+
+def bench_vehicle_detection(path, args):
+    from tracker import Tracker
+    from vehicle_detection import VehicleDetector, compose_display
+
+    profiler = Profiler("vehicle_detection")
+    frames = load_frames(path, args.frames, profiler)
+    for _ in range(args.repeat):
+        detector = VehicleDetector()
+        tracker = Tracker()
+        for frame in frames:
+            with profiler.stage("detect"):
+                fgmask, detections = detector.detect(frame)
+            with profiler.stage("track"):
+                tracks = tracker.update(detections)
+            with profiler.stage("display"):
+                compose_display(frame, detector, fgmask, detections, tracks=tracks)
+            profiler.tick()
+    return profiler
+
+
+def bench_live_sketch(path, args):
+    from sketch import SketchFilter
+
+    profiler = Profiler("live_sketch")
+    frames = load_frames(path, args.frames, profiler)
+    sketch_filter = SketchFilter()
+    for _ in range(args.repeat):
+        for frame in frames:
+            with profiler.stage("sketch"):
+                sketch_filter(frame, 12, 55)
+            profiler.tick()
+    return profiler
+
+
+def bench_live_sketch_roi(path, args):
+    from sketch import RoiSketcher
+
+    profiler = Profiler("live_sketch_roi")
+    frames = load_frames(path, args.frames, profiler)
+    height, width = frames[0].shape[:2]
+    # The middle half of the frame stands in for the selected region
+    roi_sketcher = RoiSketcher([(width // 4, height // 4, width // 2, height // 2)])
+    for _ in range(args.repeat):
+        for frame in frames:
+            frame = frame.copy()
+            with profiler.stage("sketch"):
+                roi_sketcher(frame)
+            profiler.tick()
+    roi_sketcher.close()
+    return profiler
+
+
+def bench_virtual_mouse(path, args, track_roi=False):
+    name = "virtual_mouse_roi" if track_roi else "virtual_mouse"
+    try:
+        import mediapipe as mp
+    except ImportError:
+        print(f"{name}: skipped, mediapipe is not installed")
+        return None
+    from gestures import GestureEngine, landmarks_array
+    from hand_tracking import RoiHandDetector
+
+    profiler = Profiler(name)
+    frames = load_frames(path, args.frames, profiler)
+    for _ in range(args.repeat):
+        hands_detector = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=1,
+                                                  min_detection_confidence=0.7)
+        detector = RoiHandDetector(hands_detector) if track_roi else hands_detector
+        gesture_engine = GestureEngine()
+        for frame in frames:
+            with profiler.stage("preprocess"):
+                frame = cv2.flip(frame, 1)
+                frame_height, frame_width, _ = frame.shape
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            with profiler.stage("inference"):
+                output = detector.process(rgb_frame)
+            with profiler.stage("landmarks"):
+                for hand in output.multi_hand_landmarks or []:
+                    gesture_engine(landmarks_array(hand, frame_width, frame_height))
+            profiler.tick()
+        hands_detector.close()
+    return profiler
+
+
+def bench_palette(args):
+    spec = importlib.util.spec_from_file_location("palette_app", PALETTE_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    profiler = Profiler("palette")
+    rng = np.random.default_rng(0)
+    for _ in range(args.repeat):
+        app = module.InteractiveDigitalPalette(headless=True, profiler=profiler)
+        top = app.interface_height
+        # Random strokes of 50 mouse moves each, the same ones on every run
+        for _ in range(max(1, args.frames // 50)):
+            x, y = rng.integers(0, app.width), rng.integers(top, top + app.height)
+            app.mouse_callback(cv2.EVENT_LBUTTONDOWN, int(x), int(y), 0, None)
+            for _ in range(50):
+                x = int(np.clip(x + rng.integers(-15, 16), 0, app.width - 1))
+                y = int(np.clip(y + rng.integers(-15, 16), top, top + app.height - 1))
+                app.mouse_callback(cv2.EVENT_MOUSEMOVE, x, y, 0, None)
+                profiler.tick()
+            with profiler.stage("stroke_end"):
+                app.mouse_callback(cv2.EVENT_LBUTTONUP, x, y, 0, None)
+    return profiler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded videos through every app, without any window")
+    parser.add_argument("--video", help='traffic video for vehicle detection, or "synthetic:WxH:N"')
+    parser.add_argument("--hand-video", help="webcam recording for the sketch and virtual mouse (default: --video)")
+    parser.add_argument("--frames", type=int, default=300, help="frames (or palette mouse moves) per run")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs over the same frames")
+    parser.add_argument("--only", nargs="+", help="run only these benchmarks")
+    parser.add_argument("--output", help="write the results to this file (.json, or .prom for Prometheus)")
+    args = parser.parse_args()
+
+    # The same number of OpenCV threads on every run, so results are comparable
+    cv2.setNumThreads(1)
+    hand_video = args.hand_video or args.video
+    benchmarks = {
+        "vehicle_detection": lambda: bench_vehicle_detection(args.video, args) if args.video else None,
+        "live_sketch": lambda: bench_live_sketch(hand_video, args) if hand_video else None,
+        "live_sketch_roi": lambda: bench_live_sketch_roi(hand_video, args) if hand_video else None,
+        "virtual_mouse": lambda: bench_virtual_mouse(hand_video, args) if hand_video else None,
+        "virtual_mouse_roi": lambda: bench_virtual_mouse(hand_video, args, track_roi=True) if hand_video else None,
+        "palette": lambda: bench_palette(args),
+    }
+
+    profilers = []
+    for name, run in benchmarks.items():
+        if args.only and name not in args.only:
+            continue
+        start = time.perf_counter()
+        profiler = run()
+        if profiler is None:
+            continue
+        profiler.print_summary()
+        print(f"({time.perf_counter() - start:.1f}s)\n")
+        profilers.append(profiler)
+
+    if args.output:
+        if args.output.endswith((".prom", ".txt")):
+            text = "".join(profiler.to_prometheus() for profiler in profilers)
+        else:
+            text = json.dumps([profiler.summary() for profiler in profilers], indent=2)
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
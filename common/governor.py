@@ -0,0 +1,167 @@
+import threading
+import time
+
+from common.sources import FAST
+from common.timing import LatencyHistogram
+
+
+class FrameGovernor:
+    """Latency-aware replacement for capture.read() in live loops.
+
+    A grabber thread reads the source continuously and keeps only the newest
+    frame, so frames piling up in the camera buffer are drained instead of
+    being processed seconds late; every frame replaced before the loop took
+    it counts as dropped. After each frame the loop calls done(), which
+    measures the latency from capture to display. While that latency stays
+    above `target_latency` the governor hands out only every n-th new frame
+    (the others count as skipped), and it goes back to every frame once the
+    loop keeps up again. A loop whose processing alone takes longer than the
+    target cannot be helped by skipping, so the stride is left alone then.
+
+        governor = FrameGovernor(capture, target_latency=0.1).start()
+        while True:
+            ret, frame = governor.read()
+            ...process and display...
+            governor.done()
+
+    Sources played as fast as possible (pace FAST) are never dropped or
+    skipped, the grabber just waits for the loop to take every frame. If
+    reading the source raises, read() raises that exception instead of
+    waiting for frames that will never come.
+    """
+
+    def __init__(self, source, target_latency=0.1, max_stride=8, adjust_every=10):
+        self.source = source
+        self.target_latency = target_latency
+        self.max_stride = max_stride
+        self.adjust_every = adjust_every
+        self.lossless = not getattr(source, "live", True) and getattr(source, "pace", None) == FAST
+
+        self.condition = threading.Condition()
+        self.frame = None
+        self.frame_time = None
+        self.finished = False
+        self.error = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._grab_loop, name="grabber", daemon=True)
+
+        self.stride = 1
+        self.waiting = 0
+        self.current_time = None
+        self.read_time = None
+        self.average_latency = None
+        self.average_busy = None
+        self.since_adjust = 0
+        self.latency = LatencyHistogram()
+        self.grabbed = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.processed = 0
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _grab_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                ret, frame = self.source.read()
+            except Exception as error:
+                self.error = error
+                ret, frame = False, None
+            now = time.perf_counter()
+            with self.condition:
+                if not ret:
+                    self.finished = True
+                    self.condition.notify_all()
+                    return
+                if self.lossless:
+                    while self.frame is not None and not self.stop_event.is_set():
+                        self.condition.wait(0.1)
+                elif self.frame is not None:
+                    self.dropped += 1
+                self.frame = frame
+                self.frame_time = now
+                self.grabbed += 1
+                self.condition.notify_all()
+
+    def read(self):
+        """Wait for the next frame to process and return (ret, frame) like capture.read()"""
+        with self.condition:
+            while not self.stop_event.is_set():
+                if self.frame is not None:
+                    frame, frame_time, self.frame = self.frame, self.frame_time, None
+                    self.condition.notify_all()
+                    self.waiting += 1
+                    if self.waiting >= self.stride:
+                        self.waiting = 0
+                        self.current_time = frame_time
+                        self.read_time = time.perf_counter()
+                        return True, frame
+                    # The loop is running over the latency target, let this one go
+                    self.skipped += 1
+                    continue
+                if self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    return False, None
+                self.condition.wait(0.1)
+        return False, None
+
+    def done(self):
+        """Mark the end of the frame returned by the last read() and adapt the stride"""
+        if self.current_time is None:
+            return
+        now = time.perf_counter()
+        latency = now - self.current_time
+        self.current_time = None
+        self.latency.record(latency)
+        self.processed += 1
+        if self.average_latency is None:
+            self.average_latency = latency
+            self.average_busy = now - self.read_time
+        else:
+            self.average_latency = 0.8 * self.average_latency + 0.2 * latency
+            self.average_busy = 0.8 * self.average_busy + 0.2 * (now - self.read_time)
+
+        if self.lossless:
+            return
+        self.since_adjust += 1
+        if self.since_adjust >= self.adjust_every:
+            self.since_adjust = 0
+            # Skipping only helps with the time a frame waits, never with the processing itself
+            over = self.average_latency > self.target_latency and self.average_busy < self.target_latency
+            if over and self.stride < self.max_stride:
+                self.stride += 1
+            elif self.average_latency < 0.6 * self.target_latency and self.stride > 1:
+                self.stride -= 1
+
+    def stats(self):
+        return {
+            "grabbed": self.grabbed,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "stride": self.stride,
+            "latency_p50_ms": round(1000 * self.latency.percentile(0.50), 2),
+            "latency_p95_ms": round(1000 * self.latency.percentile(0.95), 2),
+        }
+
+    def print_summary(self):
+        s = self.stats()
+        print(f"frames: {s['grabbed']} grabbed, {s['processed']} processed, {s['dropped']} dropped "
+              f"(stale), {s['skipped']} skipped (over latency target)")
+        print(f"capture to display latency: p50 {s['latency_p50_ms']:.1f} ms, p95 {s['latency_p95_ms']:.1f} ms")
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        self.thread.join()
+
+
+def add_governor_arguments(parser, default_ms=100):
+    """Add the --target-latency option used by the live loops"""
+    parser.add_argument("--target-latency", type=float, default=default_ms,
+                        help=f"capture to display latency to aim for in ms, frames are skipped above it "
+                             f"(default: {default_ms})")
@@ -0,0 +1,192 @@
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+# Pacing modes: deliver frames at the source frame rate, or as fast as they are read
+REALTIME = "realtime"
+FAST = "fast"
+
+
+class FrameSource:
+    """Base class of all frame sources, with the same read() as cv2.VideoCapture.
+
+    Subclasses implement _next() (return the next frame or None) and
+    optionally _rewind(). With pace=REALTIME, read() waits so frames come out
+    at `fps`, with pace=FAST they come out as fast as they are produced. With
+    loop=True the source starts over when it runs out of frames.
+    """
+
+    live = False
+
+    def __init__(self, fps=30.0, pace=FAST, loop=False):
+        if pace not in (REALTIME, FAST):
+            raise ValueError(f"Unknown pacing mode: {pace}")
+        self.fps = fps
+        self.pace = pace
+        self.loop = loop
+        self.frames_read = 0
+        self.next_time = None
+
+    def _next(self):
+        raise NotImplementedError
+
+    def _rewind(self):
+        raise NotImplementedError(f"{type(self).__name__} can't loop")
+
+    def read(self):
+        frame = self._next()
+        if frame is None and self.loop and self.frames_read:
+            self._rewind()
+            frame = self._next()
+        if frame is None:
+            return False, None
+
+        if self.pace == REALTIME and not self.live:
+            now = time.perf_counter()
+            if self.next_time is None:
+                self.next_time = now
+            delay = self.next_time - now
+            if delay > 0:
+                time.sleep(delay)
+            # Don't try to catch up on frames we are already late for
+            self.next_time = max(self.next_time, now - 1 / self.fps) + 1 / self.fps
+        self.frames_read += 1
+        return True, frame
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+    def __iter__(self):
+        while True:
+            ret, frame = self.read()
+            if not ret:
+                return
+            yield frame
+
+
+class CaptureSource(FrameSource):
+    """Webcam, stream URL or video file read through cv2.VideoCapture"""
+
+    def __init__(self, source, pace=FAST, loop=False):
+        self.live = isinstance(source, int) or "://" in str(source)
+        self.capture = cv2.VideoCapture(source)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open source: {source}")
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        super().__init__(fps if fps and fps > 0 else 30.0, pace, loop and not self.live)
+
+    def _next(self):
+        ret, frame = self.capture.read()
+        return frame if ret else None
+
+    def _rewind(self):
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        self.capture.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Every image in a directory, in file name order"""
+
+    def __init__(self, directory, fps=30.0, pace=FAST, loop=False):
+        super().__init__(fps, pace, loop)
+        self.paths = sorted(path for path in glob.glob(os.path.join(directory, "*"))
+                            if path.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.paths:
+            raise IOError(f"No images in directory: {directory}")
+        self.index = 0
+
+    def _next(self):
+        while self.index < len(self.paths):
+            frame = cv2.imread(self.paths[self.index])
+            self.index += 1
+            if frame is not None:
+                return frame
+        return None
+
+    def _rewind(self):
+        self.index = 0
+
+
+class SyntheticSource(FrameSource):
+    """Deterministic generated frames: textured background and moving shapes.
+
+    The same seed always gives the same frames, so it can stand in for a
+    camera in CI and benchmarks. `frames` is the length of the clip.
+    """
+
+    def __init__(self, width=1280, height=720, frames=300, fps=30.0, pace=FAST, loop=False, seed=0):
+        super().__init__(fps, pace, loop)
+        self.width, self.height, self.frames = width, height, frames
+        rng = np.random.default_rng(seed)
+        self.background = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+        self.shapes = [
+            {
+                "position": rng.uniform((0, 0), (width, height)),
+                "velocity": rng.uniform(-8, 8, 2),
+                "radius": int(rng.integers(min(width, height) // 20, min(width, height) // 6)),
+                "color": tuple(int(c) for c in rng.integers(0, 256, 3)),
+            }
+            for _ in range(6)
+        ]
+        self.index = 0
+
+    def _next(self):
+        if self.index >= self.frames:
+            return None
+        frame = self.background.copy()
+        size = np.array((self.width, self.height))
+        for i, shape in enumerate(self.shapes):
+            # Bounce off the edges by folding the position back into the frame
+            x, y = np.abs((shape["position"] + shape["velocity"] * self.index + size) % (2 * size) - size)
+            center = (int(x), int(y))
+            if i % 2:
+                cv2.circle(frame, center, shape["radius"], shape["color"], -1)
+            else:
+                r = shape["radius"]
+                cv2.rectangle(frame, (center[0] - r, center[1] - r), (center[0] + r, center[1] + r), shape["color"], -1)
+        self.index += 1
+        return frame
+
+    def _rewind(self):
+        self.index = 0
+
+
+def open_source(spec, pace=FAST, loop=False):
+    """Open a frame source from a command line string.
+
+    "0", "1", ...              webcam with that device index
+    "rtsp://..."               stream URL
+    "path/to/video.mp4"        video file
+    "path/to/images/"          every image in a directory
+    "synthetic[:WxH[:N]]"      generated frames, e.g. "synthetic:1920x1080:600"
+    """
+    spec = str(spec)
+    if spec.isdigit():
+        return CaptureSource(int(spec), pace, loop)
+    if spec.startswith("synthetic"):
+        parts = spec.split(":")
+        width, height = (int(v) for v in parts[1].split("x")) if len(parts) > 1 else (1280, 720)
+        frames = int(parts[2]) if len(parts) > 2 else 300
+        return SyntheticSource(width, height, frames, pace=pace, loop=loop)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, pace=pace, loop=loop)
+    return CaptureSource(spec, pace, loop)
+
+
+def add_source_arguments(parser, default="0"):
+    """Add the --source, --pace and --loop options shared by the webcam apps"""
+    parser.add_argument("--source", default=default,
+                        help='webcam index, video file, image directory or "synthetic:1280x720:300"')
+    parser.add_argument("--pace", choices=[REALTIME, FAST], default=REALTIME,
+                        help="play files at their frame rate or as fast as possible")
+    parser.add_argument("--loop", action="store_true", help="start over when a file source ends")
@@ -0,0 +1,188 @@
+import json
+import math
+import threading
+import time
+
+# Histogram buckets grow by 2^(1/4) (~19%) from 10 microseconds to about 10 seconds
+_FIRST_BOUND = 1e-5
+_BUCKETS_PER_DOUBLING = 4
+_BUCKET_BOUNDS = [_FIRST_BOUND * 2 ** (i / _BUCKETS_PER_DOUBLING) for i in range(81)]
+
+
+class LatencyHistogram:
+    """Fixed log-spaced latency histogram with O(1) recording.
+
+    Percentiles are read from the bucket bounds, so they are accurate to
+    about one bucket (~19%), which is plenty to tell a 5 ms stage from a 30 ms one.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds):
+        if seconds <= _FIRST_BOUND:
+            index = 0
+        else:
+            index = min(math.ceil(math.log2(seconds / _FIRST_BOUND) * _BUCKETS_PER_DOUBLING), len(_BUCKET_BOUNDS))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """Latency in seconds below which a fraction q of the samples fall"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                bound = _BUCKET_BOUNDS[index] if index < len(_BUCKET_BOUNDS) else self.max
+                return min(max(bound, self.min), self.max)
+        return self.max
+
+    def cumulative(self, every=_BUCKETS_PER_DOUBLING):
+        """(upper bound, count of samples <= bound) pairs for every `every`-th bucket"""
+        pairs = []
+        seen = 0
+        for index, bound in enumerate(_BUCKET_BOUNDS):
+            seen += self.counts[index]
+            if index % every == 0:
+                pairs.append((bound, seen))
+        return pairs
+
+
+class Stage:
+    """Latency histogram and frame rate of one named stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.histogram = LatencyHistogram()
+        self.first = None
+        self.last = None
+
+    def record(self, seconds):
+        now = time.perf_counter()
+        if self.first is None:
+            self.first = now - seconds
+        self.last = now
+        self.histogram.record(seconds)
+
+    def fps(self):
+        """Rate at which the stage completed over the time it was active"""
+        if self.histogram.count < 2 or self.last == self.first:
+            return 0.0
+        return self.histogram.count / (self.last - self.first)
+
+    def summary(self):
+        h = self.histogram
+        return {
+            "count": h.count,
+            "fps": round(self.fps(), 2),
+            "mean_ms": round(1000 * h.total / h.count, 3) if h.count else 0.0,
+            "p50_ms": round(1000 * h.percentile(0.50), 3),
+            "p95_ms": round(1000 * h.percentile(0.95), 3),
+            "p99_ms": round(1000 * h.percentile(0.99), 3),
+            "max_ms": round(1000 * h.max, 3),
+        }
+
+
+class _Timer:
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stage.record(time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """Per-stage latency histograms (p50/p95/p99) and FPS for a frame loop.
+
+        profiler = Profiler("live_sketch")
+        with profiler.stage("capture"):
+            ret, frame = capture.read()
+        ...
+        profiler.tick()  # once per frame, for the overall FPS
+        profiler.dump("metrics.json")  # or "metrics.prom" for Prometheus text
+    """
+
+    def __init__(self, name="app"):
+        self.name = name
+        self.stages = {}
+        self.frames = Stage("frame")
+        self.last_tick = None
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            with self.lock:
+                stage = self.stages.setdefault(name, Stage(name))
+        return stage
+
+    def stage(self, name):
+        """Context manager timing one run of the named stage"""
+        return _Timer(self.get(name))
+
+    def record(self, name, seconds):
+        self.get(name).record(seconds)
+
+    def tick(self):
+        """Mark the end of a frame, recording the time since the previous one"""
+        now = time.perf_counter()
+        if self.last_tick is not None:
+            self.frames.record(now - self.last_tick)
+        self.last_tick = now
+
+    def summary(self):
+        return {
+            "name": self.name,
+            "fps": round(self.frames.fps(), 2),
+            "frames": self.frames.histogram.count,
+            "stages": {name: stage.summary() for name, stage in list(self.stages.items())},
+        }
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format, one histogram series per stage"""
+        metric = f"{self.name}_stage_latency_seconds"
+        lines = [f"# HELP {metric} Latency of every processing stage.", f"# TYPE {metric} histogram"]
+        for name, stage in list(self.stages.items()):
+            h = stage.histogram
+            for bound, count in h.cumulative():
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound:.6g}"}} {count}')
+            lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {h.total:.9g}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {h.count}')
+
+        fps = f"{self.name}_fps"
+        lines += [f"# HELP {fps} Frames per second of the whole loop.", f"# TYPE {fps} gauge",
+                  f"{fps} {self.frames.fps():.3f}"]
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Write the metrics to path, as Prometheus text for .prom/.txt and JSON otherwise"""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w") as f:
+            f.write(text)
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"{summary['name']}: {summary['frames']} frames, {summary['fps']:.1f} fps")
+        print(f"{'stage':<14}{'count':>8}{'fps':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+        for name, s in summary["stages"].items():
+            print(f"{name:<14}{s['count']:>8}{s['fps']:>8.1f}{s['mean_ms']:>9.2f}"
+                  f"{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}")
@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The apps keep their modules next to their scripts, in folders that are not packages
+sys.path.insert(0, ROOT)
+for folder in ("1-Vehicle Detetion using contour concept", "2-Live Sketch", "3-My Virtual Mouse",
+               "4-Interactive Digital pallete"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
@@ -0,0 +1,29 @@
+import pytest
+
+from palette_layout import toolbar_layout
+
+BRUSH_SIZES = [2, 5, 10, 15, 20, 30]
+
+
+@pytest.mark.parametrize("width", [400, 640, 1024, 1920])
+@pytest.mark.parametrize("colors", [0, 12, 40])
+def test_every_control_is_inside_the_toolbar(width, colors):
+    layout = toolbar_layout(width, 120, [None] * colors, BRUSH_SIZES, [None] * 4, [None] * 4)
+    assert layout.height >= 120
+    for widget in layout.widgets:
+        for x0, y0, x1, y1 in (widget.box, widget.hit):
+            assert 0 <= x0 <= x1 < width and 0 <= y0 <= y1 < layout.height, widget
+
+
+@pytest.mark.parametrize("colors", [12, 40])
+def test_every_control_answers_clicks(colors):
+    layout = toolbar_layout(1024, 120, [None] * colors, BRUSH_SIZES, [None] * 4, [None] * 4)
+    for widget in layout.widgets:
+        x0, y0, x1, y1 = widget.hit
+        assert layout.hit((x0 + x1) // 2, (y0 + y1) // 2) == widget
+
+
+def test_wide_window_keeps_two_rows():
+    layout = toolbar_layout(1400, 120, [None] * 12, BRUSH_SIZES, [None] * 4, [None] * 4)
+    assert layout.height == 120
+    assert {widget.box[1] for widget in layout.widgets if widget.kind != "brush"} == {20, 80}
@@ -0,0 +1,32 @@
+import cv2
+import numpy as np
+
+from saver import write_png
+from tiled_canvas import TiledCanvas
+
+
+def painted_canvas(width, height):
+    rng = np.random.default_rng(0)
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    for _ in range(30):
+        center = tuple(int(v) for v in rng.integers(0, (width, height)))
+        color = tuple(int(v) for v in rng.integers(0, 256, 3))
+        cv2.circle(image, center, int(rng.integers(5, 150)), color, -1)
+    canvas = TiledCanvas(width, height)
+    canvas.write(0, 0, image)
+    return canvas, image
+
+
+def test_write_png_matches_the_canvas(tmp_path):
+    canvas, image = painted_canvas(700, 450)
+    for level in (None, 0, 9):
+        path = str(tmp_path / "canvas.png")
+        write_png(path, canvas, level)
+        assert np.array_equal(cv2.imread(path), image)
+
+
+def test_scaled_matches_area_resize():
+    canvas, image = painted_canvas(1000, 700)
+    expected = cv2.resize(image, (256, 179), interpolation=cv2.INTER_AREA)
+    difference = np.abs(canvas.scaled(256, 179).astype(int) - expected)
+    assert difference.max() <= 1
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from sketch import RoiSketcher, SketchFilter
+
+
+@pytest.mark.parametrize("shape", [(1, 40, 3), (40, 1, 3), (1, 1, 3)])
+def test_half_resolution_thin_image(shape):
+    image = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+    assert SketchFilter(half=True)(image, 12, 55).shape == shape[:2]
+
+
+def test_half_resolution_one_pixel_tall_roi():
+    frame = np.zeros((60, 80, 3), dtype=np.uint8)
+    roi_sketcher = RoiSketcher([(10, 20, 50, 1)], half=True, workers=1)
+    roi_sketcher(frame)
+    roi_sketcher.close()
+    # Without edges the sketch is white, and only inside the region
+    assert (frame[20, 10:60] == 255).all()
+    assert not frame[21].any()